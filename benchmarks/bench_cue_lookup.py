@@ -0,0 +1,66 @@
+# 字幕查找基准：30分钟字幕下，逐帧线性扫描 vs CueIndex 查找表
+# 用法: python benchmarks/bench_cue_lookup.py [分钟数] [帧率]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import ImageFont
+from config import Config
+from main.utils.video_core import (
+    CueIndex,
+    StaticLayerCompositor,
+    create_gradient_background,
+)
+from benchmarks.fixtures import synthetic_sub_times
+
+def linear_texts(sub_times, total_frames, fps):
+    """优化前：每帧线性扫描全部字幕"""
+    texts = []
+    for frame_idx in range(total_frames):
+        frame_time = frame_idx / fps
+        text = None
+        for start, end, sub_text in sub_times:
+            if start <= frame_time < end:
+                text = sub_text
+                break
+        texts.append(text)
+    return texts
+
+def render_loop(frame_texts, compositor, sink):
+    for text in frame_texts:
+        sink.write(compositor.frame_bytes(text))
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    fps = int(sys.argv[2]) if len(sys.argv) > 2 else 18
+    size = (640, 1220)  # create_video_single 的处理分辨率（standard 档位）
+
+    sub_times = synthetic_sub_times(minutes * 60)
+    total_frames = int(sub_times[-1][1] * fps)
+    print(f"字幕 {len(sub_times)} 条 | 帧数 {total_frames} | {fps}fps")
+
+    font = ImageFont.truetype(str(Config.VIDEO_FONT_DIR / 'ceym.ttf'), 59)
+    bg = create_gradient_background(*size)
+
+    results = {}
+    with open(os.devnull, 'wb') as sink:
+        for name, build in (
+            ("线性扫描(优化前)", lambda: linear_texts(sub_times, total_frames, fps)),
+            ("CueIndex(优化后)", lambda: CueIndex(sub_times).frame_texts(total_frames, fps)),
+        ):
+            compositor = StaticLayerCompositor(bg, font, (171, 229, 243), ("center", "middle"), size, 0, (0, 0, 0), False)
+            t0 = time.perf_counter()
+            frame_texts = build()
+            t1 = time.perf_counter()
+            render_loop(frame_texts, compositor, sink)
+            t2 = time.perf_counter()
+            results[name] = frame_texts
+            print(f"{name}: 查找 {t1 - t0:.2f}秒 | 查找+渲染循环 {t2 - t0:.2f}秒")
+
+    first, second = results.values()
+    print("结果一致" if first == second else "结果不一致!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# video_core 渲染热路径基准
+# 为 30秒/3分钟/30分钟 生成合成字幕和静音音频，逐项测量帧率、峰值内存、ffmpeg 管道吞吐，结果存为 JSON 便于跨提交对比
+# 用法: python benchmarks/bench_video_core.py [--durations 30,180,1800] [--cases ...] [--output 结果.json]
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import resource  # 仅类 Unix 系统可用
+except ImportError:
+    resource = None
+
+CASES = ('draw_text_on_frame', 'render_frame', 'merge_subtitles', 'create_video_single', 'create_video_multi')
+RENDER_FRAME_LIMIT = 2000  # render_frame 逐帧全量绘制，最多测这么多帧
+
+def peak_rss_mb():
+    """本进程与已结束子进程（ffmpeg，含生成素材时的调用）的峰值常驻内存(MB)"""
+    if resource is None:
+        return None, None
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024  # macOS 单位为字节，Linux 为 KB
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor
+    return round(own, 1), round(children, 1)
+
+def make_fixtures(seconds, work_dir):
+    from benchmarks.fixtures import synthetic_sub_times, word_sub_times, write_srt, write_silent_audio
+
+    srt_file = os.path.join(work_dir, f'{seconds}s.srt')
+    word_srt_file = os.path.join(work_dir, f'{seconds}s_words.srt')
+    audio_file = os.path.join(work_dir, f'{seconds}s.mp3')
+    write_srt(synthetic_sub_times(seconds), srt_file)
+    write_srt(word_sub_times(seconds), word_srt_file)
+    write_silent_audio(seconds, audio_file)
+    return srt_file, word_srt_file, audio_file
+
+def run_case(case, seconds, work_dir, profile):
+    """在独立子进程中执行单个用例，返回测量结果字典"""
+    from flask import Flask
+    from config import Config
+    from main.utils import video_core as vc
+
+    srt_file, word_srt_file, audio_file = make_fixtures(seconds, work_dir)
+    sub_times = _read_sub_times(vc, srt_file)
+    result = {'case': case, 'seconds': seconds}
+
+    if case == 'draw_text_on_frame':
+        font = vc.get_font(Config.VIDEO_FONT_DIR / 'ceym.ttf', 100)
+        bg = vc.create_gradient_background(*Config.SCREEN_SIZE)
+        texts = [text for _, _, text in sub_times][:64]  # 64 条 100 号字幕贴图约 20MB，能全部留在字形缓存中
+        for label, batch in (('cold', texts), ('warm', texts)):  # 第二轮全部命中字形缓存
+            t0 = time.perf_counter()
+            for text in batch:
+                vc.draw_text_on_frame(bg, text, font, (0, 0, 255), ('center', 'middle'), Config.SCREEN_SIZE, 2, (0, 0, 0), False)
+            elapsed = time.perf_counter() - t0
+            result[f'{label}_calls_per_sec'] = round(len(batch) / elapsed, 1)
+
+    elif case == 'render_frame':
+        fps = 24
+        font = vc.get_font(Config.VIDEO_FONT_DIR / 'ceym.ttf', 100)
+        bg = vc.create_gradient_background(*Config.SCREEN_SIZE)
+        cue_index = vc.CueIndex(sub_times)
+        frames = min(int(seconds * fps), RENDER_FRAME_LIMIT)
+        t0 = time.perf_counter()
+        for i in range(frames):
+            vc.render_frame((i, cue_index, bg, Config.SCREEN_SIZE, font, (0, 0, 255), ('center', 'middle'), 2, (0, 0, 0), False, fps))
+        elapsed = time.perf_counter() - t0
+        result.update(frames=frames, fps=round(frames / elapsed, 1))
+
+    elif case == 'merge_subtitles':
+        cues_before = len(_read_sub_times(vc, word_srt_file))
+        t0 = time.perf_counter()
+        vc.merge_subtitles(word_srt_file, 2)
+        elapsed = time.perf_counter() - t0
+        result.update(cues_before=cues_before, cues_after=len(_read_sub_times(vc, word_srt_file)),
+                      cues_per_sec=round(cues_before / elapsed, 1))
+
+    else:
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        render = getattr(vc, case)
+        profile_spec = vc.get_render_profile(profile)
+        width, height = (int(v * profile_spec['scale']) for v in Config.SCREEN_SIZE)
+        output_file = os.path.join(work_dir, f'{case}_{seconds}s.mp4')
+        with app.app_context():
+            t0 = time.perf_counter()
+            render(srt_file, audio_file, output_file, Config.SCREEN_SIZE, '基准测试标题', 'frames', profile=profile)
+            elapsed = time.perf_counter() - t0
+        frames = int(seconds * profile_spec['fps'])
+        result.update(
+            profile=profile,
+            seconds_elapsed=round(elapsed, 2),
+            frames=frames,
+            fps=round(frames / elapsed, 1),
+            pipe_mb_per_sec=round(frames * width * height * 3 / elapsed / 1024 / 1024, 1),  # rawvideo bgr24 写入量
+            output_ok=os.path.exists(output_file) and os.path.getsize(output_file) > 0
+        )
+
+    result['peak_rss_mb'], result['ffmpeg_peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def _read_sub_times(vc, srt_file):
+    from main.utils.srt_core import load_srt
+    return load_srt(srt_file).sub_times()
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='video_core 渲染基准')
+    parser.add_argument('--durations', default='30,180,1800', help='素材时长(秒)，逗号分隔')
+    parser.add_argument('--cases', default=','.join(CASES), help='要运行的用例，逗号分隔')
+    parser.add_argument('--profile', default='standard', help='create_video_* 使用的渲染档位')
+    parser.add_argument('--output', help='结果 JSON 路径，默认 benchmarks/results/<时间>-<提交>.json')
+    parser.add_argument('--run-case', nargs=2, metavar=('CASE', 'SECONDS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 子进程模式：只跑一个用例，结果以 JSON 打印到 stdout 最后一行
+    if args.run_case:
+        work_dir = tempfile.mkdtemp(prefix='bench_')
+        try:
+            result = run_case(args.run_case[0], int(args.run_case[1]), work_dir, args.profile)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    if not shutil.which('ffmpeg'):
+        sys.exit('需要安装 ffmpeg')
+
+    results = []
+    for seconds in (int(d) for d in args.durations.split(',')):
+        for case in args.cases.split(','):
+            # 每个用例单独起进程，峰值内存互不干扰
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-case', case, str(seconds), '--profile', args.profile],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                result = {'case': case, 'seconds': seconds, 'error': (proc.stderr.strip().splitlines() or ['未知错误'])[-1]}
+            else:
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(json.dumps(result, ensure_ascii=False))
+            results.append(result)
+
+    revision = git_revision()
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{revision or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'revision': revision, 'created_at': datetime.now().isoformat(timespec='seconds'),
+                   'profile': args.profile, 'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}")
+
+if __name__ == '__main__':
+    main()
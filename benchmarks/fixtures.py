@@ -0,0 +1,36 @@
+# 基准测试用的合成素材：字幕、静音音频（离线生成，只依赖 ffmpeg）
+import random
+import subprocess
+
+def synthetic_sub_times(seconds, seed=42, min_len=0.4, max_len=2.0):
+    """生成首尾相接、间隔随机的合成字幕 [(start, end, text)]"""
+    rng = random.Random(seed)
+    sub_times = []
+    t = 0.0
+    while t < seconds:
+        duration = rng.uniform(min_len, max_len)
+        sub_times.append((t, min(t + duration, seconds), f"第{len(sub_times)}句字幕测试"))
+        t += duration + rng.choice([0.0, 0.0, 0.05, 0.3])
+    return sub_times
+
+def word_sub_times(seconds, seed=42):
+    """模拟 edge-tts 逐词字幕（短词、紧密相接），用于 merge_subtitles"""
+    return synthetic_sub_times(seconds, seed=seed, min_len=0.15, max_len=0.45)
+
+def srt_timestamp(seconds):
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+def write_srt(sub_times, srt_filename):
+    with open(srt_filename, "w", encoding="utf-8") as f:
+        for i, (start, end, text) in enumerate(sub_times, 1):
+            f.write(f"{i}\n{srt_timestamp(start)} --> {srt_timestamp(end)}\n{text}\n\n")
+
+def write_silent_audio(seconds, audio_filename):
+    """用 ffmpeg 的 anullsrc 生成指定时长的静音 MP3"""
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error',
+         '-f', 'lavfi', '-i', 'anullsrc=r=24000:cl=mono',
+         '-t', str(seconds), '-c:a', 'libmp3lame', '-b:a', '48k', str(audio_filename)],
+        check=True
+    )
@@ -25,26 +25,64 @@ class Config:
     VIDEO_FONT_DIR = MAIN_STATIC_FOLDER / 'fonts'           # 字体目录
     PROMPT_DIR = MAIN_STATIC_FOLDER / 'prompts'        # AI提示词目录
     HTML_DIR = MAIN_STATIC_FOLDER / 'html'          # HTML模板目录
+    WORKSPACE_DIR = INSTANCE_DIR / 'workspaces'  # 任务工作区根目录（每个任务一个独立子目录，结束即清理）
+    KEEP_WORKSPACE = os.getenv('KEEP_WORKSPACE', '0') == '1'  # 调试用：任务结束后保留工作区
+    JOB_DIR = INSTANCE_DIR / 'jobs'  # 任务清单目录（每个任务一份 <任务ID>.json，记录输入与产物）
+    COVER_TEMPLATE = 'template-xhscover.html'                             # 封面模板（HTML_DIR 下）
+    COVER_RENDERER = os.getenv('COVER_RENDERER', 'browser')              # browser 用 Chromium 渲染模板 / pillow 直接绘制默认模板（与模板的像素一致性未经验证，需显式开启）
+    COVER_VARIANTS = {  # 由封面一次性派生的各比例/尺寸：size 宽高、format jpg/webp、max_kb 体积上限
+        '3x4': {'size': (1080, 1440), 'format': 'jpg', 'max_kb': 1024},
+        '9x16': {'size': (1080, 1920), 'format': 'jpg', 'max_kb': 1024},
+        '16x9': {'size': (1920, 1080), 'format': 'jpg', 'max_kb': 1024},
+        'thumb': {'size': (300, 400), 'format': 'webp', 'max_kb': 40},
+    }
+    COVER_PLATFORM_VARIANTS = {'xhs': '3x4', 'douyin': '9x16', 'sph': '3x4'}  # 各平台上传使用的封面规格
+    BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 1))            # 封面截图常驻浏览器数（每个一个工作线程）
+    BROWSER_RECYCLE_AFTER = int(os.getenv('BROWSER_RECYCLE_AFTER', 200))  # 每个浏览器渲染多少次后重启，0 为不回收
+    COVER_RENDER_TIMEOUT_S = float(os.getenv('COVER_RENDER_TIMEOUT_S', 30))  # 单张封面截图最长等待秒数，超时视为失败
     SCREEN_SIZE = (1080, 2060)              # 视频分辨率
+    VIDEO_RENDER_MODE = os.getenv('VIDEO_RENDER_MODE')  # frames 逐帧管道 / stills 每条字幕一张静帧（可变帧率），不设置则跟随渲染档位
+    VIDEO_RENDERER = os.getenv('VIDEO_RENDERER', 'python')  # python 逐帧合成 / ass 由 ffmpeg(libass) 烧录字幕
+    VIDEO_PIPELINE = os.getenv('VIDEO_PIPELINE', '1') != '0'  # 单音色文本边合成语音边编码视频（仅 python 渲染器的逐帧模式）
+    RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', 1))  # 帧渲染进程数，1 为单进程（默认），多进程需显式开启
+
+    # 渲染档位：scale 相对 SCREEN_SIZE 的缩放，fps 帧率，speed 编码速度档位，quality 编码质量(CRF/CQ)
+    RENDER_PROFILES = {
+        'draft': {'scale': 360 / 1080, 'fps': 12, 'speed': 'ultrafast', 'quality': 30, 'render_mode': 'stills'},  # 预览，几秒出片
+        'standard': {'scale': 640 / 1080, 'fps': 18, 'speed': 'fast', 'quality': 23},
+        'high': {'scale': 1.0, 'fps': 24, 'speed': 'fast', 'quality': 20},
+    }
+    DEFAULT_RENDER_PROFILE = os.getenv('DEFAULT_RENDER_PROFILE', 'standard')
+
+    # 字幕排版：逐词字幕合并为整条字幕时的约束
+    SUB_MAX_DURATION_S = float(os.getenv('SUB_MAX_DURATION_S', 2))  # 单条字幕最长时长(秒)
+    SUB_MAX_CHARS = int(os.getenv('SUB_MAX_CHARS', 0)) or None       # 单条字幕最多字数，0 为不限
+    SUB_MAX_LINES = int(os.getenv('SUB_MAX_LINES', 1))               # 超宽时最多折成几行
+    SUB_MAX_WIDTH_RATIO = 0.9                                         # 每行最大宽度占画面宽度的比例
     
     # ==================== 语音合成配置 ====================
-    VOICE_NAMES = [
-        "zh-CN-XiaoxiaoNeural",    # 普通话女声-晓晓
-        "zh-CN-XiaoyiNeural",      # 普通话女声-晓伊
-        "zh-CN-YunjianNeural",     # 普通话男声-云健
-        "zh-CN-YunxiNeural",      # 普通话男声-云溪
-        "zh-CN-YunxiaNeural",     # 普通话男声-云霞
-        "zh-CN-YunyangNeural",    # 普通话男声-云扬
-        "zh-CN-liaoning-XiaobeiNeural",  # 东北女声
-        "zh-CN-shaanxi-XiaoniNeural",    # 陕西女声
-        "zh-HK-HiuGaaiNeural",    # 粤语女声-晓佳
-        "zh-HK-HiuMaanNeural",    # 粤语女声-晓敏
-        "zh-HK-WanLungNeural",   # 粤语男声-云龙
-        "zh-TW-HsiaoChenNeural",  # 台湾女声-晓晨
-        "zh-TW-HsiaoYuNeural",    # 台湾女声-晓雨
-        "zh-TW-YunJheNeural"     # 台湾男声-云哲
-    ]
+    VOICE_CATALOG_FILE = MAIN_STATIC_FOLDER / 'voices' / 'edge_tts_voices.json'  # edge-tts 音色快照，仓库内为手工整理的兜底列表（python -m main.utils.voice_core 刷新）
+    VOICE_LOCALES = ('zh-CN', 'zh-CN-liaoning', 'zh-CN-shaanxi', 'zh-HK', 'zh-TW')  # 页面上提供的语言区域，空元组为全部
     DEFAULT_VOICE = "zh-CN-YunxiaNeural"
+    DEFAULT_SPEAKER_VOICES = {  # 对话文本的默认 角色 -> 音色 映射，用户可在数据库中保存自己的映射
+        "傣momo": "zh-CN-YunxiNeural",
+        "喇cici": "zh-CN-XiaoxiaoNeural"
+    }
+    TTS_CACHE_DIR = INSTANCE_DIR / 'tts_cache'                    # 语音合成缓存目录
+    TTS_CACHE_MAX_MB = int(os.getenv('TTS_CACHE_MAX_MB', 1024))    # 缓存总大小上限(MB)，0 为关闭缓存
+    TTS_CONCURRENCY = int(os.getenv('TTS_CONCURRENCY', 4))         # 同时进行的 edge-tts 请求数
+    TTS_RETRIES = int(os.getenv('TTS_RETRIES', 3))                 # 单个片段失败后的重试次数
+    TTS_CHUNK_CHARS = int(os.getenv('TTS_CHUNK_CHARS', 400))       # 单音色长文本按句分块并发合成的块长，0 为整段合成
+    
+    # ==================== 大模型配置 ====================
+    LLM_PROVIDERS = {  # 每个服务商一个常驻客户端，密钥和地址从环境变量读取
+        'deepseek': {'api_key_env': 'API_KEY_DS', 'base_url_env': 'URL_DS', 'model': 'deepseek-chat'},
+        'moonshot': {'api_key_env': 'API_KEY_KIMI', 'base_url_env': 'URL_KIMI', 'model': 'moonshot-v1-8k'},
+    }
+    LLM_TIMEOUT_S = float(os.getenv('LLM_TIMEOUT_S', 120))               # 单次请求总超时(秒)
+    LLM_CONNECT_TIMEOUT_S = float(os.getenv('LLM_CONNECT_TIMEOUT_S', 10)) # 建立连接超时(秒)
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))               # 连接错误/限流时 SDK 自动重试次数
+    LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', 10))      # 每个服务商的连接池上限（空闲连接保持复用）
     
     # ==================== 数据库配置 ====================
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', f"sqlite:///{Path(__file__).parent / 'instance' / 'app.db'}")
@@ -69,7 +107,8 @@ class Config:
             cls.INPUT_DIR,
             
             # 系统目录
-            cls.INSTANCE_DIR
+            cls.INSTANCE_DIR,
+            cls.JOB_DIR
         ]
         
         for dir_path in required_dirs:
@@ -4,8 +4,9 @@ import json
 import asyncio
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, render_template, request, jsonify, send_file
-from flask_login import login_required
+from flask_login import login_required, current_user
 from extensions import csrf
 from config import Config
 from . import main_bp  # 蓝图导入放在其他本地导入之前
@@ -13,8 +14,11 @@ from .utils.video_core import (
     speaking,
     process_dialogue,
     merge_subtitles,
+    subtitle_layout,
     create_video_multi,
     create_video_single,  # Linux
+    create_video_ass,
+    create_video_streaming,
     creating_cover,
     generating_byds,
     extractting,
@@ -29,7 +33,11 @@ from .utils.video_core import (
     xhs_video_upload
 )
 from .utils.publisher_core import WeChatPublisher
-from .utils.db_utils import get_db_credentials
+from .utils.workspace_core import JobWorkspace
+from .utils.job_core import new_job_id, JobManifest
+from .utils.cover_core import derive_covers, platform_cover
+from .utils.voice_core import voice_names, validate_voice, validate_voice_mapping
+from .utils.db_utils import get_db_credentials, get_speaker_voices, save_speaker_voices
 
 # --------------------------
 # 基础视图路由
@@ -37,7 +45,7 @@ from .utils.db_utils import get_db_credentials
 @main_bp.route('/')
 def index():
     """主入口页面"""
-    return render_template('main/index.html', voice_names=Config.VOICE_NAMES, default_voice=Config.DEFAULT_VOICE)
+    return render_template('main/index.html', voice_names=voice_names(), default_voice=Config.DEFAULT_VOICE)
 
 @main_bp.route('/video_creator')
 @login_required
@@ -52,8 +60,10 @@ def video_creator():
     
     return render_template(
         'main/video_creator.html', 
-        voice_names=Config.VOICE_NAMES, 
+        voice_names=voice_names(), 
         default_voice=Config.DEFAULT_VOICE,
+        render_profiles=Config.RENDER_PROFILES,
+        default_profile=Config.DEFAULT_RENDER_PROFILE,
         wp_creds_valid=wp_creds_valid,
         wechat_creds_valid=wechat_creds_valid
     )
@@ -75,8 +85,12 @@ def generate_titles():
         return jsonify({'error': '请输入台词'}), 400
     
     try:
-        title_txt = generating_byds(input_text, str(Config.PROMPT_DIR / "top_title.prompt"))[:12]
-        cover_txt = generating_byds(input_text, str(Config.PROMPT_DIR / "cover_title.prompt"))
+        # 两个请求互不依赖，共用连接池并行发出
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            title_future = executor.submit(generating_byds, input_text, str(Config.PROMPT_DIR / "top_title.prompt"))
+            cover_future = executor.submit(generating_byds, input_text, str(Config.PROMPT_DIR / "cover_title.prompt"))
+            title_txt = title_future.result()[:12]
+            cover_txt = cover_future.result()
         
         return jsonify({
             'title': title_txt,
@@ -93,6 +107,7 @@ def process_url():
     if not (url.startswith("http://") or url.startswith("https://")):
         return jsonify({'error': '无效的URL'}), 400
     
+    manifest = None
     try:
         # 提取内容
         content_text = extractting(url)
@@ -133,8 +148,10 @@ def process_url():
                 'wx_result': '公众号发布已跳过'
             })
 
-        # 生成基准文件名（当前日期时间）
-        working_dir = datetime.now().strftime("%Y%m%d%H%M%S")
+        # 任务ID作为文章工作目录名，同一秒内的请求也不会互相覆盖
+        working_dir = new_job_id(url, mode)
+        manifest = JobManifest(working_dir, 'article', inputs={'url': url, 'mode': mode},
+                               outputs={'article_dir': Config.ARTICLE_DIR / working_dir})
         # 使用配置的工作目录路径
         working_path = Config.ARTICLE_DIR / working_dir
         working_path.mkdir(parents=True, exist_ok=True)  # 自动创建目录
@@ -222,6 +239,7 @@ def process_url():
             
             wx_result = publisher.publish()
         
+        manifest.succeed(website_url=post["link"] if post else "", wx_published=bool(wx_result))
         return jsonify({
             'website_url': post["link"] if post else "WordPress发布已跳过",
             'article_text': audioscript,
@@ -229,25 +247,69 @@ def process_url():
             'wx_result': "公众号发布成功" if wx_result else ("公众号发布已跳过" if wx_result is None else "公众号发布失败")
         })
     except Exception as e:
+        if manifest:
+            manifest.fail(e)
         return jsonify({'error': f'处理URL时出错: {str(e)}'}), 500
 
+@main_bp.route('/speaker_voices', methods=['GET', 'POST'])
+@login_required
+def speaker_voices():
+    """查看/保存当前用户的对话角色音色映射，POST 提交 JSON {角色: 音色}"""
+    if request.method == 'GET':
+        return jsonify({'mapping': get_speaker_voices(current_user.id), 'voices': voice_names()})
+    
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not payload:
+        return jsonify({'error': '请提交 {角色: 音色} 映射'}), 400
+    # 先规范化角色名再校验：" A" 和 "A" 是同一个角色，重复提交直接拒绝，避免违反 (用户, 角色) 唯一约束
+    mapping = {}
+    for speaker, voice in payload.items():
+        if not isinstance(voice, str):
+            return jsonify({'error': f'角色 {speaker} 的音色必须是字符串'}), 400
+        speaker = speaker.strip()
+        if speaker in mapping:
+            return jsonify({'error': f'角色名重复: {speaker}'}), 400
+        mapping[speaker] = voice.strip()
+    try:
+        validate_voice_mapping(mapping)
+        save_speaker_voices(current_user.id, mapping)
+        return jsonify({'mapping': get_speaker_voices(current_user.id)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'保存音色映射时出错: {str(e)}'}), 500
+
 @main_bp.route('/generate_video', methods=['POST'])
 @login_required
 def generate_video():
     input_text = request.form.get('text', '')
     title_txt = request.form.get('title', '')
     cover_txt = request.form.get('cover', '')
-    voice = request.form.get('voice', Config.VOICE_NAMES[4])
-    VOICE_MAPPING = {
-    "傣momo": "zh-CN-YunxiNeural",
-    "喇cici": "zh-CN-XiaoxiaoNeural"
-    }
+    voice = request.form.get('voice', Config.DEFAULT_VOICE)
+    profile = request.form.get('profile', Config.DEFAULT_RENDER_PROFILE)
+    VOICE_MAPPING = get_speaker_voices(current_user.id)  # 对话文本的 角色 -> 音色
     if not cover_txt:
         return jsonify({'error': '请补充封面描述'}), 400
+    if profile not in Config.RENDER_PROFILES:
+        return jsonify({'error': f'未知渲染档位: {profile}'}), 400
+    # 判断是否为对话文本（包含角色前缀）；相同文本的重复合成由语音缓存负责，不再按文件名复用
+    is_dialogue = any(
+        line.strip().split(':', 1)[0].strip() in VOICE_MAPPING  # 直接检查是否在VOICE_MAPPING的键中
+        for line in input_text.split('\n')
+        if ':' in line
+    )
+    # 合成前先校验音色，避免白跑一整轮语音合成 + 渲染；角色映射只在对话文本中用到
+    try:
+        validate_voice(voice)
+        if is_dialogue:
+            validate_voice_mapping(VOICE_MAPPING)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
+    manifest = None
     try:
-        # 获取当前日期
-        base_filename = datetime.now().strftime("%Y%m%d%H%M%S")
+        # 任务ID：时间前缀 + 随机段 + 输入哈希，并发请求各自独立，不会复用别的任务的音频/字幕
+        base_filename = new_job_id(input_text, voice, profile, title_txt, cover_txt)
         
         # 文件路径
         txt_file = str(Config.INPUT_DIR / f"{base_filename}.txt")
@@ -255,41 +317,62 @@ def generate_video():
         audio_filename = str(Config.OUTPUT_DIR / f"{base_filename}.mp3")
         output_filename = str(Config.OUTPUT_DIR / f"{base_filename}.mp4")
         cover_filename = str(Config.OUTPUT_DIR / f"{base_filename}.png")
+        manifest = JobManifest(
+            base_filename, 'video',
+            inputs={'text': input_text, 'title': title_txt, 'cover': cover_txt, 'voice': voice, 'profile': profile},
+            outputs={'text': txt_file, 'srt': srt_file, 'audio': audio_filename, 'video': output_filename, 'cover': cover_filename}
+        )
 
         # 将输入文本写入文件
         with open(txt_file, 'w', encoding='utf-8') as f:
             f.write(input_text)
         
-        if not os.path.exists(audio_filename) or not os.path.exists(srt_file):
-            # 判断是否为对话文本（包含角色前缀）
-            is_dialogue = any(
-                line.strip().split(':', 1)[0].strip() in VOICE_MAPPING  # 直接检查是否在VOICE_MAPPING的键中
-                for line in input_text.split('\n')
-                if ':' in line
-            )
-            
+        # 每个任务独立的工作区：语音分段、渲染中间文件都在其中，结束（含出错）时清理
+        with JobWorkspace(base_filename) as workspace:
+            # 单音色文本且逐帧渲染时走流水线：边合成语音边编码视频
+            render_mode = Config.VIDEO_RENDER_MODE or Config.RENDER_PROFILES[profile].get('render_mode', 'frames')
+            streaming = False
+            cues = None  # 字幕在合成、合并、渲染各阶段之间直接在内存中传递
+
             if is_dialogue:
-                asyncio.run(process_dialogue(txt_file, audio_filename, srt_file, VOICE_MAPPING, temp_dir="tmp", silence_duration_ms=500))
+                cues = asyncio.run(process_dialogue(txt_file, audio_filename, srt_file, VOICE_MAPPING, temp_dir=workspace.subdir("tts"), silence_duration_ms=500))
+            elif Config.VIDEO_PIPELINE and Config.VIDEO_RENDERER == 'python' and render_mode == 'frames':
+                streaming = True
             else:
                 # 普通单文本处理模式（原基础函数）
-                asyncio.run(speaking(audio_filename, srt_file, input_text, voice))
-        merge_subtitles(srt_file, 2)
+                cues = asyncio.run(speaking(audio_filename, srt_file, input_text, voice))
+            if not streaming:
+                cues = merge_subtitles(srt_file, Config.SUB_MAX_DURATION_S, cues, **subtitle_layout())
             
-        # 生成封面图片
-        cover_keywords = generating_byds(cover_txt, str(Path(Config.PROMPT_DIR) / 'cover_keywords.prompt'))
-        creating_cover(cover_txt, cover_keywords, cover_filename)
+            # 生成封面图片
+            cover_keywords = generating_byds(cover_txt, str(Path(Config.PROMPT_DIR) / 'cover_keywords.prompt'))
+            creating_cover(cover_txt, cover_keywords, cover_filename)
+            if os.path.exists(cover_filename):  # 一次性派生各平台的封面比例/尺寸
+                manifest.update(outputs={f'cover_{name}': path for name, path in derive_covers(cover_filename).items()})
         
-        # 根据操作系统选择不同的视频创建函数
-        if os.name == 'nt':  # Windows系统
-            create_video_multi(srt_file, audio_filename, output_filename, Config.SCREEN_SIZE, title_txt)
-        else:  
-            create_video_single(srt_file, audio_filename, output_filename, Config.SCREEN_SIZE, title_txt)
+            # 根据配置/操作系统选择不同的视频创建函数
+            if streaming:  # 语音合成、字幕合并与视频编码同时进行
+                rendered = create_video_streaming(input_text, voice, audio_filename, srt_file, output_filename, Config.SCREEN_SIZE, title_txt, Config.SUB_MAX_DURATION_S, Config.RENDER_WORKERS, profile=profile, layout=subtitle_layout(), work_dir=workspace.path)
+            elif Config.VIDEO_RENDERER == 'ass':  # 字幕交给 ffmpeg(libass) 烧录
+                rendered = create_video_ass(srt_file, audio_filename, output_filename, Config.SCREEN_SIZE, title_txt, profile=profile, cues=cues, work_dir=workspace.path)
+            elif os.name == 'nt':  # Windows系统
+                rendered = create_video_multi(srt_file, audio_filename, output_filename, Config.SCREEN_SIZE, title_txt, Config.VIDEO_RENDER_MODE, Config.RENDER_WORKERS, profile=profile, cues=cues, work_dir=workspace.path)
+            else:  
+                rendered = create_video_single(srt_file, audio_filename, output_filename, Config.SCREEN_SIZE, title_txt, Config.VIDEO_RENDER_MODE, Config.RENDER_WORKERS, profile=profile, cues=cues, work_dir=workspace.path)
         
+        manifest.update(pipeline='streaming' if streaming else 'sequential', dialogue=is_dialogue)
+        if rendered is False:  # 渲染器出错时返回 False（详细原因已打印）
+            manifest.fail('视频渲染失败')
+            return jsonify({'error': '生成视频时出错: 视频渲染失败'}), 500
+        manifest.succeed()
         return jsonify({
+            'job_id': base_filename,
             'cover_path': f'/main/static/output/outputs/{base_filename}.png',
             'video_path': f'/main/static/output/outputs/{base_filename}.mp4'
         })
     except Exception as e:
+        if manifest:
+            manifest.fail(e)
         return jsonify({'error': f'生成视频时出错: {str(e)}'}), 500
 
 @main_bp.route('/upload_video', methods=['POST'])
@@ -308,15 +391,20 @@ def upload_video():
     try:
         # 上传小红书 
         acct_info = Path(Config.MAIN_STATIC_FOLDER) / 'cookies' / 'cookie_xhs_zhi.json'
-        xhs_result = xhs_video_upload(video_path, cover_path, title, desc, acct_info)
+        xhs_result = xhs_video_upload(video_path, platform_cover(cover_path, 'xhs'), title, desc, acct_info)
         
         # 上传抖音
         acct_info = Path(Config.MAIN_STATIC_FOLDER) / 'cookies' / 'cookie_douyin_zhi.json'
-        dy_result = dy_video_upload(video_path, cover_path, title, desc, acct_info)
+        dy_result = dy_video_upload(video_path, platform_cover(cover_path, 'douyin'), title, desc, acct_info)
         
         # 上传视频号
         acct_info = Path(Config.MAIN_STATIC_FOLDER) / 'cookies' / 'cookie_sph_zhi.json'
-        sph_result = sph_video_upload(video_path, cover_path, title, desc, acct_info)
+        sph_result = sph_video_upload(video_path, platform_cover(cover_path, 'sph'), title, desc, acct_info)
+        
+        # 上传结果记入对应任务的清单（旧的按时间命名的产物没有清单，跳过）
+        manifest = JobManifest.load(base_filename)
+        if manifest:
+            manifest.update(uploads={'xhs': bool(xhs_result), 'douyin': bool(dy_result), 'sph': bool(sph_result)})
         
         if xhs_result and dy_result and sph_result:  # 可根据实际需求调整判断逻辑
             return jsonify({'message': '视频已成功上传到各平台'})
@@ -325,6 +413,25 @@ def upload_video():
     except Exception as e:
         return jsonify({'error': f'上传视频时出错: {str(e)}'}), 500
 
+@main_bp.route('/derive_covers', methods=['POST'])
+@login_required
+def derive_covers_route():
+    """为已生成的封面批量派生各比例/尺寸，返回 {规格名: URL}"""
+    cover_url = request.form.get('cover_path', '')
+    base_filename = cover_url.split('/')[-1].split('.')[0]
+    cover_path = Path(Config.OUTPUT_DIR) / f'{base_filename}.png'
+    if not base_filename or not cover_path.exists():
+        return jsonify({'error': '封面不存在'}), 404
+    names = [name for name in request.form.get('variants', '').split(',') if name] or None
+    if names and any(name not in Config.COVER_VARIANTS for name in names):
+        return jsonify({'error': f'未知封面规格，可选: {", ".join(Config.COVER_VARIANTS)}'}), 400
+    
+    try:
+        covers = derive_covers(cover_path, names)
+        return jsonify({name: f'/main/static/output/outputs/{Path(path).name}' for name, path in covers.items()})
+    except Exception as e:
+        return jsonify({'error': f'生成封面时出错: {str(e)}'}), 500
+
 @main_bp.route('/download_video')
 @login_required
 def download_video():
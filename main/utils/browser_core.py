@@ -0,0 +1,160 @@
+# 常驻无头浏览器池：封面等截图任务不再每次冷启动 Chromium
+# Playwright 同步 API 的对象只能在创建它的线程里使用，所以每个工作线程独占一个浏览器，
+# 调用方把 "拿到 page 之后要做的事" 提交给池，由工作线程执行并返回结果。
+# 每个工作线程复用同一个 context/page；浏览器断开时自动重启，渲染满 N 次后主动回收，防止内存膨胀。
+import atexit
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+from config import Config
+
+_STOP = object()
+
+class BrowserPool:
+    """用法:
+        pool = get_browser_pool()
+        pool.run(lambda page: page.screenshot(path='x.png'))
+
+    setup(page) 用于路由注册等只需做一次的准备工作：同一个 page 上每个 setup 只执行一次，换新 page 后重新执行。
+    """
+
+    def __init__(self, size=1, recycle_after=200, viewport=None, launch_options=None, timeout=30):
+        self.size = max(1, size)
+        self.recycle_after = recycle_after      # 每个浏览器最多渲染多少次后重启，0 为不回收
+        self.timeout = timeout                  # run() 默认的等待秒数，浏览器卡死时调用方不会一直挂起
+        self.viewport = viewport                # 新建 page 时的视口大小
+        self.launch_options = {'headless': True, **(launch_options or {})}
+        self.jobs = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def _start_workers(self):
+        """补齐工作线程（调用方持有 self.lock）：第一次使用时启动，已退出的线程在这里替换"""
+        if self.closed:
+            raise RuntimeError('浏览器池已关闭')
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+        while len(self.workers) < self.size:
+            worker = threading.Thread(target=self._worker, name=f'browser-pool-{len(self.workers)}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, fn, setup=None):
+        """提交任务 fn(page)，返回 Future"""
+        future = Future()
+        with self.lock:  # 与 _worker 退出时的清理互斥，保证入队的任务总有线程处理或被标记失败
+            self._start_workers()
+            self.jobs.put((fn, setup, future))
+        return future
+
+    def run(self, fn, setup=None, timeout=None):
+        """提交任务并等待结果，任务里的异常原样抛出；超过 timeout（默认 self.timeout）秒抛出 TimeoutError"""
+        future = self.submit(fn, setup)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            future.cancel()  # 还在排队的任务不再执行
+            raise
+
+    def _worker(self):
+        try:
+            from playwright.sync_api import sync_playwright
+
+            with sync_playwright() as p:
+                self._serve(p)
+        except BaseException as e:
+            # Playwright 本身起不来（未安装、驱动异常等）：线程退出前把排队中的任务都以该异常结束，
+            # 不让调用方干等到超时；下次提交任务时会重新拉起工作线程
+            with self.lock:
+                if threading.current_thread() in self.workers:
+                    self.workers.remove(threading.current_thread())
+                self._fail_pending(e)
+
+    def _fail_pending(self, error):
+        """取出队列中所有未开始的任务并以 error 结束（调用方持有 self.lock）"""
+        stops = 0
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                stops += 1
+                continue
+            future = job[2]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+        for _ in range(stops):  # 关闭信号留给其他工作线程
+            self.jobs.put(_STOP)
+
+    def _serve(self, p):
+        """工作线程主循环：独占一个浏览器，逐个执行队列中的任务"""
+        browser = page = None
+        prepared = set()  # 当前 page 上已执行过的 setup
+        renders = 0
+        while True:
+            job = self.jobs.get()
+            if job is _STOP:
+                break
+            fn, setup, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                # 健康检查：浏览器断开或达到回收次数时重启
+                if browser is not None and (not browser.is_connected() or (self.recycle_after and renders >= self.recycle_after)):
+                    self._close_browser(browser)
+                    browser = page = None
+                if browser is None:
+                    browser = p.chromium.launch(**self.launch_options)
+                    renders = 0
+                if page is None or page.is_closed():
+                    context = browser.new_context(viewport=self.viewport) if self.viewport else browser.new_context()
+                    page = context.new_page()
+                    prepared = set()
+                if setup is not None and setup not in prepared:
+                    setup(page)
+                    prepared.add(setup)
+                renders += 1
+                future.set_result(fn(page))
+            except BaseException as e:
+                future.set_exception(e)
+                # 出错后页面状态不可信，下一个任务换新的 context/page
+                if page is not None:
+                    try:
+                        page.context.close()
+                    except Exception:
+                        pass
+                    page = None
+        if browser is not None:
+            self._close_browser(browser)
+
+    @staticmethod
+    def _close_browser(browser):
+        try:
+            browser.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """通知所有工作线程关闭浏览器并退出"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            workers = list(self.workers)
+        for _ in workers:
+            self.jobs.put(_STOP)
+        for worker in workers:
+            worker.join(timeout=10)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """进程内共享的浏览器池（按 Config 创建，进程退出时关闭）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(Config.BROWSER_POOL_SIZE, Config.BROWSER_RECYCLE_AFTER, timeout=Config.COVER_RENDER_TIMEOUT_S)
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,243 @@
+# 封面的 Pillow 渲染：按 template-xhscover.html 的版式直接绘制（1200x1600 横线信纸背景、ceym.ttf 字体、
+# 关键词下半截黄色高亮、字号从 190 起每次减 10 直到排得下），不需要浏览器，单张几十毫秒。
+# 版式常量与模板中的 CSS 一一对应，修改模板样式时需同步修改这里；自定义模板请改用浏览器渲染。
+import os
+import re
+from functools import lru_cache
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from config import Config
+
+COVER_SIZE = (1200, 1600)
+BACKGROUND = (240, 240, 240)            # body background-color: #f0f0f0
+RULE_COLOR = (173, 216, 230, 64)        # 横线 rgba(173, 216, 230, 0.5)，29px→30px 渐变在像素中心取到一半
+RULE_PITCH = 30                         # background-size: 100% 30px，渐变自下而上，每格最上 1px 为横线
+BOX = (50, 50, 1150, 1600)              # .container 的内边距盒（margin 50，宽 1060 + 左右 padding 20，超出画布部分被裁掉）
+CONTENT_LEFT, CONTENT_TOP = 70, 150     # padding-left 20 / padding-top 100
+CONTENT_WIDTH, CONTENT_HEIGHT = 1060, 1460
+FONT_SIZES = range(190, 0, -10)         # adjustFontSize：190 起每次减 10，最小到 10
+LINE_HEIGHT = 1.5
+HIGHLIGHT_PAD = 4                       # .highlight 左右 padding
+HIGHLIGHT_COLOR = (255, 255, 0)
+HIGHLIGHT_RADIUS = 3
+TEXT_COLOR = (0, 0, 0)
+# 不能出现在行首的标点（浏览器的避头规则），遇到时把上一行最后一个字一起带到下一行
+NO_LINE_START = set('，。、！？；：）》」』】〉”’…,.!?;:)]}%')
+_CJK_RANGES = '⺀-鿿豈-﫿＀-￯　-〿'
+_UNIT = re.compile(rf'\s|[^\s{_CJK_RANGES}]+|.')  # 中文逐字、西文按词、空格单独成单元
+
+@lru_cache(maxsize=32)
+def _font(size):
+    return ImageFont.truetype(str(Config.VIDEO_FONT_DIR / 'ceym.ttf'), size)
+
+@lru_cache(maxsize=4096)
+def _advance(size, text):
+    return _font(size).getlength(text)
+
+@lru_cache(maxsize=1)
+def _background():
+    """信纸背景：从内边距盒顶部起每 30px 一条半透明浅蓝横线"""
+    image = Image.new('RGB', COVER_SIZE, BACKGROUND)
+    overlay = Image.new('RGBA', COVER_SIZE, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for y in range(BOX[1], BOX[3], RULE_PITCH):
+        draw.line([(BOX[0], y), (BOX[2] - 1, y)], fill=RULE_COLOR)
+    image.paste(overlay, (0, 0), overlay)
+    return image
+
+def _highlight_mask(paragraph, keywords):
+    """逐字标记是否属于关键词（按关键词顺序、不区分大小写，已标记的字不重复高亮）"""
+    mask = [False] * len(paragraph)
+    for keyword in keywords:
+        if not keyword:
+            continue
+        for match in re.finditer(re.escape(keyword), paragraph, re.IGNORECASE):
+            if not any(mask[match.start():match.end()]):
+                mask[match.start():match.end()] = [True] * (match.end() - match.start())
+    return mask
+
+def _units(paragraph, mask, size):
+    """切成排版单元 [文本, 宽度, 是否高亮, 是否与下一单元粘连]
+
+    中文逐字、西文按词、空格单独成单元；关键词只覆盖半个西文单词时在高亮边界切开，
+    切开的两半互相粘连（断行和两端对齐都不在其间插入空隙）。高亮段两端各加 4px padding。
+    """
+    units = []
+    for match in _UNIT.finditer(paragraph):
+        start, end = match.span()
+        piece_start = start
+        for i in range(start + 1, end + 1):
+            if i == end or mask[i] != mask[piece_start]:
+                text = paragraph[piece_start:i]
+                units.append([text, _advance(size, text), mask[piece_start], i < end])
+                piece_start = i
+    for i, unit in enumerate(units):
+        if unit[2]:
+            if i == 0 or not units[i - 1][2]:
+                unit[1] += HIGHLIGHT_PAD
+            if i == len(units) - 1 or not units[i + 1][2]:
+                unit[1] += HIGHLIGHT_PAD
+    return units
+
+def _wrap(units):
+    """把单元按宽度断行，返回行列表（每行为单元列表）"""
+    lines, line, width = [], [], 0.0
+    for unit in units:
+        if line and not unit[0].isspace() and width + unit[1] > CONTENT_WIDTH:
+            # 回退到最近的可断点：同一单词内不断开，行首不放避头标点
+            cut = len(line)
+            while cut > 0 and line[cut - 1][3]:
+                cut -= 1
+            if unit[0][0] in NO_LINE_START and cut == len(line) and cut > 1:
+                cut -= 1
+            if cut == 0:
+                cut = len(line)
+            lines.append(line[:cut])
+            line = line[cut:]
+            width = sum(item[1] for item in line)
+        line.append(unit)
+        width += unit[1]
+    lines.append(line)
+    return lines
+
+@lru_cache(maxsize=64)
+def layout_cover(text, keywords):
+    """排版封面文字，返回 (字号, [(行单元列表, 是否段落末行)])；与模板一样从 190 号开始缩小直到不超出高度"""
+    paragraphs = [re.sub(r'^\s+', '', line) for line in text.strip().split('\n')]
+    for size in FONT_SIZES:
+        line_height = size * LINE_HEIGHT
+        lines = []
+        for paragraph in paragraphs:
+            wrapped = _wrap(_units(paragraph, _highlight_mask(paragraph, keywords), size)) if paragraph else [[]]
+            lines.extend((line, i == len(wrapped) - 1) for i, line in enumerate(wrapped))
+        if len(lines) * line_height <= CONTENT_HEIGHT or size == FONT_SIZES[-1]:
+            return size, lines
+
+def render_cover(text, keywords, cover_filename):
+    """按模板版式绘制封面并保存为 PNG"""
+    if isinstance(keywords, str):
+        keywords = keywords.split(',')
+    size, lines = layout_cover(text, tuple(keywords))
+    font = _font(size)
+    ascent, descent = font.getmetrics()
+    line_height = size * LINE_HEIGHT
+    half_leading = (line_height - ascent - descent) / 2
+
+    # 先算好每个单元的位置，再画高亮底色，最后画字，避免底色盖住相邻的字
+    highlights, glyphs = [], []
+    for row, (line, last) in enumerate(lines):
+        # 行尾空格不参与两端对齐
+        while line and line[-1][0].isspace():
+            line = line[:-1]
+        # text-align: justify，段落末行左对齐，其余行把剩余宽度平均分到可断开的单元间隙
+        gaps = sum(1 for unit in line[:-1] if not unit[3])
+        extra = 0.0
+        if gaps and not last:
+            extra = max((CONTENT_WIDTH - sum(unit[1] for unit in line)) / gaps, 0.0)
+        baseline = CONTENT_TOP + row * line_height + half_leading + ascent
+        x = CONTENT_LEFT
+        for i, (unit_text, width, highlighted, glued) in enumerate(line):
+            pad_left = 0
+            if highlighted:
+                # 连续高亮的单元合成一块底色（两端对齐插入的间隙也涂上），
+                # linear-gradient(to bottom, transparent 50%, yellow 50%)：只涂内容区的下半截
+                if i == 0 or not line[i - 1][2]:
+                    pad_left = HIGHLIGHT_PAD
+                    highlights.append([x, baseline - ascent + (ascent + descent) / 2, x + width, baseline + descent])
+                else:
+                    highlights[-1][2] = x + width
+            glyphs.append(((x + pad_left, baseline), unit_text))
+            x += width + (extra if i < len(line) - 1 and not glued else 0.0)
+
+    image = _background().copy()
+    draw = ImageDraw.Draw(image)
+    for box in highlights:
+        draw.rounded_rectangle(box, radius=HIGHLIGHT_RADIUS, fill=HIGHLIGHT_COLOR)
+    for position, unit_text in glyphs:
+        draw.text(position, unit_text, font=font, fill=TEXT_COLOR, anchor='ls')
+    image.save(cover_filename, 'PNG')
+
+def _fit(source, size, pad_color):
+    """按比例缩放后居中放到目标画布上（contain，不裁掉文字），空白处用背景色填充"""
+    target_w, target_h = size
+    src_h, src_w = source.shape[:2]
+    scale = min(target_w / src_w, target_h / src_h)
+    w, h = max(1, round(src_w * scale)), max(1, round(src_h * scale))
+    resized = source if (w, h) == (src_w, src_h) else cv2.resize(
+        source, (w, h), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    )
+    if (w, h) == (target_w, target_h):
+        return resized
+    canvas = np.empty((target_h, target_w, 3), dtype=np.uint8)
+    canvas[:] = pad_color
+    x, y = (target_w - w) // 2, (target_h - h) // 2
+    canvas[y:y + h, x:x + w] = resized
+    return canvas
+
+def _encode(image, fmt, max_kb):
+    """编码为 jpg/webp；设置了 max_kb 时二分查找不超过体积上限的最高质量"""
+    flag = cv2.IMWRITE_WEBP_QUALITY if fmt == 'webp' else cv2.IMWRITE_JPEG_QUALITY
+    ext = '.webp' if fmt == 'webp' else '.jpg'
+
+    def encode(quality):
+        ok, buffer = cv2.imencode(ext, image, [flag, quality])
+        if not ok:
+            raise ValueError(f'封面编码失败: {fmt}')
+        return buffer.tobytes()
+
+    data = encode(92)
+    if not max_kb or len(data) <= max_kb * 1024:
+        return data
+    low, high, best = 30, 91, None
+    while low <= high:
+        quality = (low + high) // 2
+        candidate = encode(quality)
+        if len(candidate) <= max_kb * 1024:
+            best, low = candidate, quality + 1
+        else:
+            high = quality - 1
+    return best if best is not None else encode(30)
+
+def variant_path(cover_filename, name):
+    """派生封面的路径：<封面名>_<规格名>.<格式>"""
+    spec = Config.COVER_VARIANTS[name]
+    base, _ = os.path.splitext(str(cover_filename))
+    return f"{base}_{name}.{spec['format']}"
+
+def derive_covers(cover_filename, names=None):
+    """由一张封面一次性派生各平台需要的比例/尺寸（Config.COVER_VARIANTS），返回 {规格名: 路径}
+
+    原图只解码一次；同一缩放尺寸只缩放一次，缩略图从已缩好的大图继续缩小，省去重复的全尺寸缩放。
+    """
+    source = cv2.imread(str(cover_filename), cv2.IMREAD_COLOR)
+    if source is None:
+        raise FileNotFoundError(f'封面不存在: {cover_filename}')
+    pad_color = source[0, 0].tolist()  # 左上角是页面背景色
+    names = list(names or Config.COVER_VARIANTS)
+
+    # 按面积从大到小处理，小图以已生成的、比例相同的大图为源
+    outputs, rendered = {}, []
+    for name in sorted(names, key=lambda n: -Config.COVER_VARIANTS[n]['size'][0] * Config.COVER_VARIANTS[n]['size'][1]):
+        spec = Config.COVER_VARIANTS[name]
+        w, h = spec['size']
+        base = next((image for image in rendered if image.shape[1] * h == image.shape[0] * w and image.shape[1] >= w), source)
+        image = _fit(base, (w, h), pad_color)
+        rendered.append(image)
+        path = variant_path(cover_filename, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_encode(image, spec['format'], spec.get('max_kb')))
+        os.replace(tmp_path, path)
+        outputs[name] = path
+    return {name: outputs[name] for name in names}
+
+def platform_cover(cover_filename, platform):
+    """上传到某个平台时使用的封面：按 Config.COVER_PLATFORM_VARIANTS 取派生图，缺失时当场派生"""
+    name = Config.COVER_PLATFORM_VARIANTS.get(platform)
+    if not name:
+        return str(cover_filename)
+    path = variant_path(cover_filename, name)
+    if not os.path.exists(path):
+        derive_covers(cover_filename, [name])
+    return path
@@ -1,4 +1,5 @@
-from models import db, WordPressSite, WechatAccount  # 导入数据库模型
+from config import Config
+from models import db, WordPressSite, WechatAccount, SpeakerVoice  # 导入数据库模型
 
 def get_db_credentials(service_name):
     """从数据库获取指定服务的凭据
@@ -31,3 +32,35 @@ def get_db_credentials(service_name):
     except Exception as e:
         print(f"Error fetching {service_name} credentials: {str(e)}")
         return {}
+
+def get_speaker_voices(user_id):
+    """获取用户的 角色 -> 音色 映射，用户未设置时返回默认映射
+    
+    Args:
+        user_id (int): 用户ID
+    
+    Returns:
+        dict: {角色: 音色}
+    """
+    try:
+        rows = SpeakerVoice.query.filter_by(user_id=user_id).all()
+    except Exception as e:
+        print(f"Error fetching speaker voices: {str(e)}")
+        rows = []
+    return {row.speaker: row.voice for row in rows} or dict(Config.DEFAULT_SPEAKER_VOICES)
+
+def save_speaker_voices(user_id, mapping):
+    """用新的映射整体替换用户的 角色 -> 音色 映射（调用前请先规范化角色名并校验音色）
+    
+    Args:
+        user_id (int): 用户ID
+        mapping (dict): {角色: 音色}
+    """
+    try:
+        SpeakerVoice.query.filter_by(user_id=user_id).delete()
+        for speaker, voice in mapping.items():
+            db.session.add(SpeakerVoice(user_id=user_id, speaker=speaker, voice=voice))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()  # 保存失败时不把半截的删除/插入留在会话里
+        raise
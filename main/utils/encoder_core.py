@@ -0,0 +1,145 @@
+# 视频编码器注册表：启动后探测一次 ffmpeg 可用编码器并缓存，按任务选择最快的可用编码器
+import os
+import re
+import subprocess
+from functools import lru_cache
+
+# 速度档位 -> 各编码器对应的 preset（越靠前越快）
+PRESET_TIERS = ('ultrafast', 'veryfast', 'fast')
+
+# 编码器注册表，按优先级排列：硬件编码优先，其次 libx264，libx265 兜底
+#   input_args: 放在输入之前的参数（如 VAAPI 设备）
+#   presets:    速度档位 -> 编码器自身的 preset 名
+#   args:       (preset, quality) -> 输出端编码参数
+ENCODERS = {
+    'h264_qsv': {
+        'hardware': True,
+        'input_args': lambda: [],
+        'presets': {'ultrafast': 'veryfast', 'veryfast': 'veryfast', 'fast': 'fast'},
+        'args': lambda preset, quality: [
+            '-c:v', 'h264_qsv',           # Intel 加速
+            '-preset', preset,
+            '-pix_fmt', 'yuv420p',        # Intel 默认格式
+            '-global_quality', str(quality),  # Intel 编码质量参数
+        ],
+    },
+    'h264_nvenc': {
+        'hardware': True,
+        'input_args': lambda: [],
+        'presets': {'ultrafast': 'p1', 'veryfast': 'p2', 'fast': 'p4'},
+        'args': lambda preset, quality: [
+            '-c:v', 'h264_nvenc',         # NVIDIA NVENC 编码
+            '-preset', preset,
+            '-pix_fmt', 'yuv420p',
+            '-rc', 'vbr',                 # 可变码率
+            '-cq', str(quality),          # NVENC 质量参数
+            '-b:v', '0',                  # 自动码率（基于 cq 值）
+        ],
+    },
+    'h264_vaapi': {
+        'hardware': True,
+        'input_args': lambda: ['-vaapi_device', os.getenv('VAAPI_DEVICE', '/dev/dri/renderD128')],
+        'presets': {'ultrafast': None, 'veryfast': None, 'fast': None},
+        'args': lambda preset, quality: [
+            '-vf', 'format=nv12,hwupload',
+            '-c:v', 'h264_vaapi',         # Intel/AMD 通用硬件加速
+            '-qp', str(quality),
+        ],
+    },
+    'libx264': {
+        'hardware': False,
+        'input_args': lambda: [],
+        'presets': {'ultrafast': 'ultrafast', 'veryfast': 'veryfast', 'fast': 'fast'},
+        'args': lambda preset, quality: [
+            '-c:v', 'libx264',
+            '-profile:v', 'main',
+            '-pix_fmt', 'yuv420p',
+            '-preset', preset,
+            '-crf', str(quality),
+            '-x264-params', 'ref=4:bframes=0',
+        ],
+    },
+    'libx265': {
+        'hardware': False,
+        'input_args': lambda: [],
+        'presets': {'ultrafast': 'ultrafast', 'veryfast': 'veryfast', 'fast': 'fast'},
+        'args': lambda preset, quality: [
+            '-c:v', 'libx265',
+            '-pix_fmt', 'yuv420p',
+            '-tag:v', 'hvc1',             # 兼容 Apple 播放器
+            '-preset', preset,
+            '-crf', str(quality),
+        ],
+    },
+}
+
+@lru_cache(maxsize=1)
+def available_encoders():
+    """解析 `ffmpeg -encoders` 的输出，返回编码器名集合（进程内只探测一次）"""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-encoders'],
+            capture_output=True, text=True, timeout=15
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"探测 ffmpeg 编码器失败: {e}")
+        return frozenset()
+    return frozenset(re.findall(r'^\s*V[A-Z.]{5}\s+(\S+)', result.stdout, re.MULTILINE))
+
+@lru_cache(maxsize=None)
+def encoder_works(name):
+    """用一段极短的测试画面实际编码一次，确认硬件/驱动可用（结果缓存）"""
+    if name not in ENCODERS or name not in available_encoders():
+        return False
+    spec = ENCODERS[name]
+    preset = spec['presets']['veryfast']
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        *spec['input_args'](),
+        '-f', 'lavfi', '-i', 'color=c=black:s=256x256:r=10:d=0.3',
+        *spec['args'](preset, 23),
+        '-f', 'null', '-'
+    ]
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+def encoder_chain(allow_hardware=True):
+    """按优先级返回本机实际可用的编码器名列表（回退链）"""
+    return [
+        name for name, spec in ENCODERS.items()
+        if (allow_hardware or not spec['hardware']) and encoder_works(name)
+    ]
+
+def select_encoder(speed='veryfast', quality=23, preferred=None, allow_hardware=None):
+    """为一次编码任务选择编码器
+
+    Args:
+        speed: 速度档位，见 PRESET_TIERS
+        quality: 质量参数（CRF/CQ/QP，数值越小质量越高）
+        preferred: 优先尝试的编码器名（如 'libx264'），不可用时沿回退链继续
+        allow_hardware: 是否允许硬件编码，默认读取环境变量 VIDEO_HW_ENCODE（默认开启）
+
+    Returns:
+        dict: name 编码器名, input_args 输入前参数, output_args 输出端编码参数
+    """
+    if speed not in PRESET_TIERS:
+        raise ValueError(f"未知速度档位: {speed}")
+    if allow_hardware is None:
+        allow_hardware = os.getenv('VIDEO_HW_ENCODE', '1') != '0'
+
+    chain = encoder_chain(allow_hardware)
+    if preferred in chain:
+        chain.remove(preferred)
+        chain.insert(0, preferred)
+    if not chain:
+        raise RuntimeError("没有可用的视频编码器，请检查 ffmpeg 安装")
+
+    name = chain[0]
+    spec = ENCODERS[name]
+    return {
+        'name': name,
+        'input_args': spec['input_args'](),
+        'output_args': spec['args'](spec['presets'][speed], quality),
+    }
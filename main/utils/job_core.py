@@ -0,0 +1,77 @@
+# 任务标识与任务清单：任务ID = 时间前缀 + 随机段 + 输入内容哈希，同一秒内的并发请求也不会撞名；
+# 每个任务在 JOB_DIR 下留一份 JSON 清单，记录输入参数、产物路径和状态，便于排查和复用
+import os
+import json
+import uuid
+import hashlib
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from config import Config
+
+def content_hash(*parts, length=8):
+    """输入内容的短哈希（同样的输入得到同样的哈希，便于在清单里查找重复任务）"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:length]
+
+def new_job_id(*content):
+    """生成任务ID，如 20250101120000-3f9a1c2e5b7d-ab12cd34
+
+    时间前缀保证按创建时间排序，uuid4 随机段保证唯一，内容哈希标识输入；
+    只含数字、小写字母和连字符，可直接用作文件名和 URL 片段。
+    """
+    return f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:12]}-{content_hash(*content)}"
+
+class JobManifest:
+    """任务清单（JOB_DIR/<job_id>.json），每次更新都整体原子写入"""
+
+    def __init__(self, job_id, kind, inputs=None, outputs=None):
+        self.path = Path(Config.JOB_DIR) / f"{job_id}.json"
+        self.data = {
+            'job_id': job_id,
+            'kind': kind,
+            'status': 'running',
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'updated_at': None,
+            'inputs': inputs or {},
+            'outputs': {key: str(value) for key, value in (outputs or {}).items()},
+            'error': None,
+        }
+        self.save()
+
+    @classmethod
+    def load(cls, job_id):
+        """读取已有清单，不存在时返回 None"""
+        manifest = cls.__new__(cls)
+        manifest.path = Path(Config.JOB_DIR) / f"{job_id}.json"
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                manifest.data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest
+
+    def save(self):
+        self.data['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def update(self, **fields):
+        """更新清单字段（outputs/inputs 为合并更新）并保存"""
+        for key in ('inputs', 'outputs'):
+            if key in fields:
+                self.data[key].update({k: str(v) if key == 'outputs' else v for k, v in fields.pop(key).items()})
+        self.data.update(fields)
+        self.save()
+
+    def succeed(self, **outputs):
+        self.update(status='succeeded', outputs=outputs)
+
+    def fail(self, error):
+        self.update(status='failed', error=str(error))
@@ -0,0 +1,58 @@
+# 大模型网关：每个服务商（DeepSeek、Moonshot）进程内只建一个 OpenAI 客户端，底层 httpx 连接池保持长连接复用，
+# 超时与重试按 Config 设置；提示词文件读入内存缓存，文件修改（mtime 变化）后自动重新读取
+import os
+import threading
+import httpx
+from openai import OpenAI
+from config import Config
+
+_clients = {}
+_clients_lock = threading.Lock()
+_prompts = {}  # 路径 -> (mtime_ns, 内容)
+_prompts_lock = threading.Lock()
+
+def get_client(provider):
+    """取服务商的共享客户端（首次使用时创建，OpenAI 客户端可跨线程共用）；密钥或地址未配置时抛出 ValueError"""
+    client = _clients.get(provider)
+    if client is not None:
+        return client
+    with _clients_lock:
+        if provider not in _clients:
+            spec = Config.LLM_PROVIDERS[provider]
+            api_key, base_url = os.getenv(spec['api_key_env']), os.getenv(spec['base_url_env'])
+            if not api_key or not base_url:
+                raise ValueError(f"{provider} 未配置: 请设置环境变量 {spec['api_key_env']} 和 {spec['base_url_env']}")
+            _clients[provider] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=httpx.Timeout(Config.LLM_TIMEOUT_S, connect=Config.LLM_CONNECT_TIMEOUT_S),
+                max_retries=Config.LLM_MAX_RETRIES,
+                http_client=httpx.Client(limits=httpx.Limits(
+                    max_connections=Config.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.LLM_MAX_CONNECTIONS
+                )),
+            )
+        return _clients[provider]
+
+def load_prompt(prompt_path):
+    """读取提示词文件（内存缓存，文件修改后重新读取）"""
+    prompt_path = str(prompt_path)
+    mtime_ns = os.stat(prompt_path).st_mtime_ns
+    cached = _prompts.get(prompt_path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    with open(prompt_path, 'r', encoding='utf-8') as file:
+        prompt = file.read()
+    with _prompts_lock:
+        _prompts[prompt_path] = (mtime_ns, prompt)
+    return prompt
+
+def chat(provider, messages, **params):
+    """调用服务商的默认模型，返回回复文本；接口调用失败抛出 openai.APIError，由调用方处理"""
+    completion = get_client(provider).chat.completions.create(
+        model=params.pop('model', Config.LLM_PROVIDERS[provider]['model']),
+        messages=messages,
+        stream=False,
+        **params
+    )
+    return completion.choices[0].message.content
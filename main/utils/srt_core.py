@@ -0,0 +1,247 @@
+# 字幕工具：时间统一用整数毫秒，开始/结束时间存为并行的 NumPy 数组，文本单独成表
+# 每个任务只解析一次，在语音合成、字幕合并、渲染之间直接传递 Cues 对象，不再反复读写 SRT 文件
+import re
+import numpy as np
+
+_TIMESTAMP = re.compile(r'(\d+):(\d+):(\d+)[,.](\d+)')
+_BLOCK_SPLIT = re.compile(r'\n[ \t]*\n')
+
+def ms2sec(ms):
+    """毫秒 -> 秒，按时/分/秒/毫秒分段累加（与 pysrt SubRipTime 换算相同），保证与原实现读回的浮点值逐位一致"""
+    total_seconds, milliseconds = divmod(ms, 1000)
+    hours, rest = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return hours * 3600 + minutes * 60 + seconds + milliseconds / 1000.0
+
+def parse_timestamp(timestamp):
+    """HH:MM:SS,mmm -> 毫秒"""
+    hh, mm, ss, ms = _TIMESTAMP.match(timestamp.strip()).groups()
+    return (int(hh) * 3600 + int(mm) * 60 + int(ss)) * 1000 + int(ms.ljust(3, '0')[:3])
+
+def format_timestamp(ms):
+    """毫秒 -> HH:MM:SS,mmm"""
+    total_seconds, milliseconds = divmod(int(ms), 1000)
+    hours, rest = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+class Cues:
+    """一组字幕条目：starts/ends 为 int64 毫秒数组，texts 为文本列表，三者一一对应"""
+
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self, starts=(), ends=(), texts=()):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.texts = list(texts)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        """逐条产出 (开始毫秒, 结束毫秒, 文本)"""
+        return zip(self.starts.tolist(), self.ends.tolist(), self.texts)
+
+    def shift(self, offset_ms):
+        """整体平移，返回新的 Cues"""
+        return Cues(self.starts + offset_ms, self.ends + offset_ms, self.texts)
+
+    def sub_times(self):
+        """渲染器使用的 [(开始秒, 结束秒, 文本)]"""
+        return [(ms2sec(start), ms2sec(end), text) for start, end, text in self]
+
+    @property
+    def duration(self):
+        """最后一条字幕的结束时间(秒)，与原先取 subs[-1].end 一致"""
+        return ms2sec(int(self.ends[-1])) if len(self) else 0.0
+
+def parse_srt(content):
+    """解析 SRT 文本；序号行可有可无，缺少时间轴的块会被跳过"""
+    starts, ends, texts = [], [], []
+    content = content.lstrip('﻿').replace('\r\n', '\n').strip()
+    if not content:
+        return Cues()
+    for block in _BLOCK_SPLIT.split(content):
+        lines = block.split('\n')
+        for i, line in enumerate(lines[:2]):
+            if '-->' in line:
+                start, end = line.split('-->', 1)
+                starts.append(parse_timestamp(start))
+                ends.append(parse_timestamp(end.split()[0]))
+                texts.append('\n'.join(lines[i + 1:]).rstrip())
+                break
+    return Cues(starts, ends, texts)
+
+def load_srt(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_srt(f.read())
+
+def format_srt(cues):
+    """序列化为 SRT 文本，序号从 1 重新编号（格式与 pysrt/SubMaker 写出的一致）"""
+    return ''.join(
+        f"{index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n"
+        for index, (start, end, text) in enumerate(cues, 1)
+    )
+
+def save_srt(cues, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(format_srt(cues))
+
+def concat_cues(parts):
+    """按顺序拼接多组字幕（偏移请先用 shift 处理）"""
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return Cues()
+    return Cues(
+        np.concatenate([part.starts for part in parts]),
+        np.concatenate([part.ends for part in parts]),
+        [text for part in parts for text in part.texts]
+    )
+
+def cues_from_boundaries(boundaries):
+    """edge-tts 逐词时间轴(100ns) -> Cues，取整与过滤规则同 SubMaker（空文本、时长为零的词丢弃）"""
+    starts, ends, texts = [], [], []
+    for boundary in boundaries:
+        start_us = round(boundary['offset'] / 10)
+        end_us = round((boundary['offset'] + boundary['duration']) / 10)
+        if not boundary['text'].strip() or start_us >= end_us:
+            continue
+        starts.append(start_us // 1000)
+        ends.append(end_us // 1000)
+        texts.append(boundary['text'])
+    return Cues(starts, ends, texts)
+
+def wrap_tokens(tokens, widths, max_width, max_lines):
+    """把词按顺序排成不超过 max_lines 行、每行不超过 max_width 的文本，排不下返回 None
+
+    两行时在所有可行断点里选两行宽度最接近的位置（上下行更均衡），更多行时逐行贪心填充。
+    单个词本身超宽时允许独占一行。
+    """
+    total = sum(widths)
+    if total <= max_width or len(tokens) == 1:
+        return ''.join(tokens)
+    if max_lines < 2:
+        return None
+    if max_lines == 2:
+        best = None
+        left = 0.0
+        for i in range(1, len(tokens)):
+            left += widths[i - 1]
+            right = total - left
+            if left <= max_width and right <= max_width and (best is None or max(left, right) < best[0]):
+                best = (max(left, right), i)
+        if best is None:
+            return None
+        return ''.join(tokens[:best[1]]) + '\n' + ''.join(tokens[best[1]:])
+
+    lines, line, line_width = [], [], 0.0
+    for token, width in zip(tokens, widths):
+        if line and line_width + width > max_width:
+            lines.append(''.join(line))
+            line, line_width = [], 0.0
+        line.append(token)
+        line_width += width
+    lines.append(''.join(line))
+    return '\n'.join(lines) if len(lines) <= max_lines else None
+
+class CueMerger:
+    """增量合并：逐条喂入逐词字幕，合并完成的字幕条目立即返回
+
+    相邻两条间隔不超过 0.1 秒且合并后跨度不超过 max_duration_s 时拼成一条，
+    时间以毫秒整数表示。可选的排版约束：
+        measure: 文本 -> 渲染宽度(像素)，与 max_width 一起保证合并后的字幕排得下
+        max_width: 每行最大宽度(像素)
+        max_chars: 每条字幕最多字数（不含换行）
+        max_lines: 每条字幕最多行数，大于 1 时超宽的字幕自动折行
+    """
+
+    def __init__(self, max_duration_s, measure=None, max_width=None, max_chars=None, max_lines=1):
+        self.max_duration_s = max_duration_s
+        self.measure = measure if max_width else None
+        self.max_width = max_width
+        self.max_chars = max_chars
+        self.max_lines = max_lines
+        self.current = None  # [开始毫秒, 结束毫秒, 文本]
+        self.tokens = []     # 当前条目中的词（已去首尾空白）及其宽度，用于折行
+        self.widths = []
+
+    def _layout(self, tokens, widths):
+        """按约束排版，排不下返回 None"""
+        if self.max_chars and sum(len(token) for token in tokens) > self.max_chars and len(tokens) > 1:
+            return None
+        if self.measure is None:
+            return ''.join(tokens)
+        return wrap_tokens(tokens, widths, self.max_width, self.max_lines)
+
+    def _start(self, start_ms, end_ms, text):
+        self.current = [start_ms, end_ms, text]
+        if self.measure is not None or self.max_chars:
+            token = text.strip()
+            self.tokens = [token]
+            self.widths = [self.measure(token) if self.measure else 0.0]
+            self.current[2] = self._layout(self.tokens, self.widths)
+
+    def feed(self, start_ms, end_ms, text):
+        """喂入一条字幕，返回因此而合并完成的上一条 (开始毫秒, 结束毫秒, 文本) 或 None"""
+        if self.current is None:
+            self._start(start_ms, end_ms, text)
+            return None
+        current_start, current_end, current_text = self.current
+        if ms2sec(start_ms) - ms2sec(current_end) <= 0.1 and (ms2sec(end_ms) - ms2sec(current_start)) <= self.max_duration_s:
+            if self.measure is None and not self.max_chars:
+                self.current = [current_start, end_ms, current_text.strip() + "" + text.strip()]
+                return None
+            token = text.strip()
+            tokens = self.tokens + [token]
+            widths = self.widths + [self.measure(token) if self.measure else 0.0]
+            laid_out = self._layout(tokens, widths)
+            if laid_out is not None:
+                self.current = [current_start, end_ms, laid_out]
+                self.tokens, self.widths = tokens, widths
+                return None
+        finished = tuple(self.current)
+        self._start(start_ms, end_ms, text)
+        return finished
+
+    def flush(self):
+        finished, self.current = self.current, None
+        self.tokens, self.widths = [], []
+        return tuple(finished) if finished else None
+
+def merge_cues(cues, max_duration_s, **layout):
+    """合并相邻的短字幕条目，返回新的 Cues
+
+    没有排版约束时：能否与下一条合并只取决于相邻间隔（向量化预先算好），不满足间隔条件的位置一定断开；
+    跨度上限依赖当前合并段的起点，只在间隔满足时逐条判断。
+    有排版约束（见 CueMerger）时逐条交给 CueMerger 按宽度/字数/行数装箱。
+    """
+    if not len(cues):
+        return Cues()
+    if layout.get('max_width') or layout.get('max_chars'):
+        merger = CueMerger(max_duration_s, **layout)
+        merged = [cue for cue in (merger.feed(*item) for item in cues) if cue]
+        merged.append(merger.flush())
+        return Cues(*zip(*merged))
+
+    starts, ends, texts = cues.starts.tolist(), cues.ends.tolist(), cues.texts
+    # 与 ms2sec 一致的浮点秒，保证边界情况的判定与原实现相同
+    start_s = [ms2sec(ms) for ms in starts]
+    end_s = [ms2sec(ms) for ms in ends]
+    gap_ok = (np.asarray(start_s[1:]) - np.asarray(end_s[:-1])) <= 0.1
+
+    merged_starts, merged_ends, merged_texts = [], [], []
+    head = 0
+    text = texts[0]
+    for i in range(1, len(texts)):
+        if gap_ok[i - 1] and end_s[i] - start_s[head] <= max_duration_s:
+            text = text.strip() + "" + texts[i].strip()
+        else:
+            merged_starts.append(starts[head])
+            merged_ends.append(ends[i - 1])
+            merged_texts.append(text)
+            head = i
+            text = texts[i]
+    merged_starts.append(starts[head])
+    merged_ends.append(ends[-1])
+    merged_texts.append(text)
+    return Cues(merged_starts, merged_ends, merged_texts)
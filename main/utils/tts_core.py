@@ -0,0 +1,299 @@
+# 语音合成：按 (文本, 音色, 语速/音调/音量, edge-tts 版本) 哈希寻址的磁盘缓存（按总大小 LRU 淘汰），限流重试的批量调度，长文本分句并发合成
+import os
+import re
+import json
+import random
+import asyncio
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+import edge_tts
+from config import Config
+
+EDGE_TTS_VERSION = getattr(edge_tts, '__version__', 'unknown')
+
+def tts_cache_key(text, voice, rate='+0%', pitch='+0Hz', volume='+0%'):
+    """缓存键：任一合成参数或 edge-tts 版本变化都会得到新键"""
+    payload = json.dumps([EDGE_TTS_VERSION, voice, rate, pitch, volume, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class TTSCache:
+    """磁盘缓存，每条记录为 <key>.mp3 + <key>.json（逐词时间轴）
+
+    命中时刷新文件 mtime，淘汰时按 mtime 从旧到新删除，直到总大小低于上限。
+    写入先落临时文件再 os.replace，多进程同时写同一条也不会读到半截文件。
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # 首次写入时统计，之后增量维护
+
+    def _paths(self, key):
+        shard = self.cache_dir / key[:2]
+        return shard / f"{key}.mp3", shard / f"{key}.json"
+
+    def get(self, key):
+        """返回 (mp3 字节, 逐词时间轴列表)，未命中返回 None"""
+        audio_path, meta_path = self._paths(key)
+        try:
+            audio = audio_path.read_bytes()
+            boundaries = json.loads(meta_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        for path in (audio_path, meta_path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return audio, boundaries
+
+    def put(self, key, audio, boundaries):
+        audio_path, meta_path = self._paths(key)
+        audio_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json.dumps(boundaries, ensure_ascii=False).encode('utf-8')
+        # 先写时间轴再写音频：get 以两者都存在为命中
+        for path, data in ((meta_path, meta), (audio_path, audio)):
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_size()
+            else:
+                self._total += len(audio) + len(meta)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for path in self.cache_dir.glob('*/*'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            yield path, stat
+
+    def _scan_size(self):
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self):
+        """删除最久未使用的记录，降到上限的 90% 以下，避免每次写入都触发扫描"""
+        entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= stat.st_size
+            except OSError:
+                pass
+        self._total = total
+
+_cache = None
+
+def get_tts_cache():
+    """进程内共享的缓存实例；TTS_CACHE_MAX_MB 设为 0 时关闭缓存"""
+    global _cache
+    if Config.TTS_CACHE_MAX_MB <= 0:
+        return None
+    if _cache is None:
+        _cache = TTSCache(Config.TTS_CACHE_DIR, Config.TTS_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
+
+async def synthesize(text, voice, rate='+0%', pitch='+0Hz', volume='+0%'):
+    """合成一段语音，先查缓存
+
+    Returns:
+        (mp3 字节, 逐词时间轴)，时间轴为 edge-tts WordBoundary 消息的
+        {'offset', 'duration', 'text'} 列表，单位 100ns
+    """
+    cache = get_tts_cache()
+    key = tts_cache_key(text, voice, rate, pitch, volume)
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+
+    communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch, volume=volume)
+    audio = bytearray()
+    boundaries = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+        elif chunk["type"] == "WordBoundary":
+            boundaries.append({'offset': chunk['offset'], 'duration': chunk['duration'], 'text': chunk['text']})
+
+    audio = bytes(audio)
+    if cache is not None and audio:
+        cache.put(key, audio, boundaries)
+    return audio, boundaries
+
+class TTSBatchError(RuntimeError):
+    """部分片段重试后仍失败；已成功的片段保留在 results 中（并已写入缓存）"""
+
+    def __init__(self, errors, results):
+        self.errors = errors
+        self.results = results
+        detail = '; '.join(f"#{i}: {e}" for i, e in sorted(errors.items()))
+        super().__init__(f"{len(errors)}/{len(results)} 个语音片段合成失败: {detail}")
+
+async def run_tts_jobs(jobs, concurrency=None, retries=None, backoff_s=1.0, on_progress=None):
+    """限流并发执行一批语音合成任务
+
+    Args:
+        jobs: 无参协程工厂列表，每次重试都会重新调用工厂生成新的协程
+        concurrency: 同时进行的合成数，默认 Config.TTS_CONCURRENCY
+        retries: 单个片段失败后的重试次数，默认 Config.TTS_RETRIES
+        backoff_s: 退避基数，第 n 次重试前等待 backoff_s * 2^n 秒并叠加随机抖动
+        on_progress: 回调 (已完成数, 总数, 片段序号, 是否成功)
+
+    Returns:
+        list: 与 jobs 一一对应的结果
+
+    Raises:
+        TTSBatchError: 所有片段都跑完后仍有失败时抛出，不会因单个失败中断其他片段
+    """
+    concurrency = concurrency or Config.TTS_CONCURRENCY
+    retries = Config.TTS_RETRIES if retries is None else retries
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [None] * len(jobs)
+    errors = {}
+    finished = 0
+
+    async def run(index, job):
+        nonlocal finished
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:  # 退避等待期间不占用并发名额
+                    results[index] = await job()
+                break
+            except Exception as e:
+                if attempt == retries:
+                    errors[index] = e
+                else:
+                    await asyncio.sleep(backoff_s * 2 ** attempt * random.uniform(0.5, 1.5))
+        finished += 1
+        if on_progress:
+            on_progress(finished, len(jobs), index, index not in errors)
+
+    await asyncio.gather(*(run(i, job) for i, job in enumerate(jobs)))
+    if errors:
+        raise TTSBatchError(errors, results)
+    return results
+
+# ==================== 长文本分句并发合成 ====================
+# Layer III 码率表(kbps)与采样率表，用于逐帧计算 MP3 时长
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2
+}
+_MP3_BITRATES[0] = _MP3_BITRATES[2]                                          # MPEG-2.5
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def _mp3_frames(data):
+    """逐个解析 MP3 帧头，产出 (起始偏移, 帧长, 每帧采样数, 采样率)"""
+    pos = 0
+    if data[:3] == b'ID3':  # 跳过 ID3v2 标签
+        pos = 10 + ((data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F))
+    while pos + 4 <= len(data):
+        b1, b2 = data[pos + 1], data[pos + 2]
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+        if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0 or version == 1 or layer != 1 \
+                or bitrate_idx in (0, 15) or rate_idx == 3:
+            raise ValueError(f"无法解析的 MP3 帧头，偏移 {pos}")
+        samples = 1152 if version == 3 else 576
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_idx]
+        length = samples // 8 * _MP3_BITRATES[version][bitrate_idx] * 1000 // sample_rate + ((b2 >> 1) & 1)
+        yield pos, length, samples, sample_rate
+        pos += length
+
+def _is_info_frame(data, pos, length):
+    """Xing/Info 帧只携带元数据，拼接时需要去掉，否则播放器会把首段时长当成整段时长"""
+    frame = data[pos:pos + length]
+    return b'Xing' in frame[:64] or b'Info' in frame[:64]
+
+def mp3_duration(data):
+    """按帧累加 MP3 时长，单位与 WordBoundary 相同（100ns），不解码"""
+    ticks = 0
+    for i, (pos, length, samples, sample_rate) in enumerate(_mp3_frames(data)):
+        if i == 0 and _is_info_frame(data, pos, length):
+            continue
+        ticks += samples * 10_000_000 // sample_rate
+    return ticks
+
+def strip_mp3_header(data):
+    """去掉 ID3 标签和 Xing/Info 帧，只保留可直接首尾拼接的音频帧"""
+    frames = _mp3_frames(data)
+    for pos, length, _, _ in frames:
+        if _is_info_frame(data, pos, length):
+            return data[pos + length:]
+        return data[pos:]
+    return b''
+
+# 英文句号只在其后是空白或文本结尾时算句末，避免切开 3.14、e.g 之类
+_SENTENCE_END = re.compile(r'(?<=[。！？!?；;…\n])|(?<=\.)(?=\s|$)')
+
+def split_text(text, max_chars):
+    """按句子/段落边界切块，每块不超过 max_chars（单句超长时整句成块）"""
+    chunks, current = [], ''
+    for sentence in _SENTENCE_END.split(text):
+        if current and len(current) + len(sentence) > max_chars:
+            chunks.append(current)
+            current = ''
+        current += sentence
+    if current.strip():
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+async def synthesize_stream(text, voice, rate='+0%', pitch='+0Hz', volume='+0%', max_chars=None):
+    """长文本分块并发合成，按顺序逐块产出 (mp3 字节, 逐词时间轴)
+
+    第 k 块一合成完（且前面各块都已产出）就立即交给调用方，下游可以边合成边消费。
+    多块时各块 MP3 去掉头部元数据帧，可直接首尾相接（同一音色输出格式一致，无需重新编码）；
+    逐词时间轴已按前面各块的精确帧时长累加偏移。
+    """
+    max_chars = Config.TTS_CHUNK_CHARS if max_chars is None else max_chars
+    chunks = split_text(text, max_chars) if max_chars > 0 and len(text) > max_chars else [text]
+    if len(chunks) == 1:
+        yield await synthesize(text, voice, rate=rate, pitch=pitch, volume=volume)
+        return
+
+    parts = [None] * len(chunks)
+    settled = [asyncio.Event() for _ in chunks]
+
+    async def job(index):
+        parts[index] = await synthesize(chunks[index], voice, rate=rate, pitch=pitch, volume=volume)
+
+    def mark(done, total, index, ok):
+        settled[index].set()
+
+    runner = asyncio.ensure_future(run_tts_jobs([lambda i=i: job(i) for i in range(len(chunks))], on_progress=mark))
+    try:
+        offset = 0
+        for index in range(len(chunks)):
+            await settled[index].wait()
+            if parts[index] is None:
+                await runner  # 该块重试后仍失败，等全部结束后抛出 TTSBatchError
+            part_audio, part_boundaries = parts[index]
+            yield strip_mp3_header(part_audio), [{**b, 'offset': b['offset'] + offset} for b in part_boundaries]
+            offset += mp3_duration(part_audio)
+        await runner
+    finally:
+        if not runner.done():
+            runner.cancel()
+
+async def synthesize_chunked(text, voice, rate='+0%', pitch='+0Hz', volume='+0%', max_chars=None):
+    """长文本分块并发合成，再按顺序拼回整段，文本不足一块时等同于 synthesize"""
+    audio = bytearray()
+    boundaries = []
+    async for part_audio, part_boundaries in synthesize_stream(text, voice, rate, pitch, volume, max_chars):
+        audio.extend(part_audio)
+        boundaries.extend(part_boundaries)
+    return bytes(audio), boundaries
@@ -6,33 +6,44 @@ import io
 import asyncio
 import re
 import base64
+import bisect
 import time
+import math
+import tempfile
 import subprocess
 import shutil
+import queue
+import threading
 from typing import Dict, List, Tuple
 from datetime import datetime
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
-from flask import current_app
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import multiprocessing
+from multiprocessing import shared_memory
+from flask import current_app, has_app_context
 from config import Config
+from .encoder_core import select_encoder
+from .tts_core import synthesize_chunked, synthesize_stream, run_tts_jobs, mp3_duration
+from .workspace_core import JobWorkspace
+from .browser_core import get_browser_pool
+from .cover_core import render_cover
+from .llm_core import chat, get_client, load_prompt
+from .srt_core import Cues, CueMerger, ms2sec, load_srt, save_srt, concat_cues, merge_cues, cues_from_boundaries
 # ===== 图像/视频处理 =====
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-# ===== 音频处理 =====
-from pydub import AudioSegment
-# ===== 字幕处理 =====
-import pysrt
 # ===== 网络请求 =====
 import requests
+from openai import APIError
 # ===== 数据解析 =====
 import yaml
 import markdown
 from bs4 import BeautifulSoup
 # ===== 模板引擎 =====
 from jinja2 import Template
-# ===== 语音合成 =====
-import edge_tts
 # ===== 浏览器自动化 =====
 # from selenium import webdriver
 # from selenium.webdriver.common.by import By
@@ -41,34 +52,30 @@ import edge_tts
 # from selenium.webdriver.support.ui import WebDriverWait
 # from selenium.webdriver.support import expected_conditions as EC
 from playwright.sync_api import sync_playwright, expect
-# ===== AI服务 =====
-from openai import OpenAI
 
-async def speaking(OUTPUT_FILE: str, WEBVTT_FILE: str, TEXT: str, VOICE: str) -> None:
+async def speaking(OUTPUT_FILE: str, WEBVTT_FILE: str, TEXT: str, VOICE: str, rate: str = "+0%", pitch: str = "+0Hz", max_chars: int = None) -> Cues:
     # 确保目录存在
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
     os.makedirs(os.path.dirname(WEBVTT_FILE), exist_ok=True)
     
-    communicate = edge_tts.Communicate(TEXT, VOICE)
-    submaker = edge_tts.SubMaker()
+    # 长文本按句分块并发合成（max_chars=0 时整段合成）；相同文本和音色直接命中语音缓存，重复渲染不再请求 edge-tts
+    audio, boundaries = await synthesize_chunked(TEXT, VOICE, rate=rate, pitch=pitch, max_chars=max_chars)
     with open(OUTPUT_FILE, "wb") as file:
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                file.write(chunk["data"])
-            elif chunk["type"] == "WordBoundary":
-                submaker.feed(chunk)
+        file.write(audio)
 
-    with open(WEBVTT_FILE, "w", encoding="utf-8") as file:
-        file.write(submaker.get_srt())
+    # 逐词字幕同时写盘并返回，后续合并/渲染直接使用内存中的 Cues
+    cues = cues_from_boundaries(boundaries)
+    save_srt(cues, WEBVTT_FILE)
+    return cues
 
 async def process_dialogue(
     input_file: str,
     output_audio: str,
     output_srt: str,
     voice_mapping: Dict[str, str],
-    temp_dir: str = "tmp",
+    temp_dir: str = None,
     silence_duration_ms: int = 100
-) -> None:
+) -> Cues:
     """
     处理多角色对话文本，生成合并后的音频和字幕（带静音间隔）
     
@@ -77,9 +84,16 @@ async def process_dialogue(
         output_audio: 输出音频文件路径
         output_srt: 输出字幕文件路径
         voice_mapping: 角色到语音的映射字典
-        temp_dir: 临时文件存放目录
+        temp_dir: 临时文件存放目录（通常为任务工作区的子目录），不传时使用一个独立的临时工作区
         silence_duration_ms: 角色间静音间隔时长(毫秒)
+        
+    Returns:
+        合并后的字幕
     """
+    if temp_dir is None:
+        with JobWorkspace('dialogue') as workspace:
+            return await process_dialogue(input_file, output_audio, output_srt, voice_mapping, workspace.path, silence_duration_ms)
+
     # 确保临时目录存在
     os.makedirs(temp_dir, exist_ok=True)
     
@@ -88,6 +102,7 @@ async def process_dialogue(
     
     # 为每个对话片段生成音频和字幕
     tasks = []
+    task_parts = []  # 任务序号 -> 对话片段序号
     for i, (speaker, text) in enumerate(dialogues):
         voice = voice_mapping.get(speaker)
         if not voice:
@@ -96,18 +111,24 @@ async def process_dialogue(
         audio_file = os.path.join(temp_dir, f"part_{i}.mp3")
         srt_file = os.path.join(temp_dir, f"part_{i}.srt")
         
-        tasks.append(speaking(audio_file, srt_file, text, voice))
+        # 对话台词较短，整段合成：外层 run_tts_jobs 已限制并发与重试，片段内不再分块嵌套调度
+        tasks.append(lambda a=audio_file, s=srt_file, t=text, v=voice: speaking(a, s, t, v, max_chars=0))
+        task_parts.append(i)
     
-    # 并行处理所有对话片段
-    await asyncio.gather(*tasks)
+    def report(done, total, index, ok):
+        print(f"语音合成进度 {done}/{total}" + ("" if ok else f"（片段 {index} 重试后仍失败）"))
+
+    # 限流并发处理对话片段，单个片段失败会重试，已完成的片段保留在缓存中
+    part_cues = dict(zip(task_parts, await run_tts_jobs(tasks, on_progress=report)))
     
     # 合并音频和字幕（带静音间隔）
-    merge_audio_and_srt_with_silence(
+    cues = merge_audio_and_srt_with_silence(
         temp_dir, 
         len(dialogues), 
         output_audio, 
         output_srt,
-        silence_duration_ms
+        silence_duration_ms,
+        part_cues
     )
     
     # 清理临时文件
@@ -117,6 +138,7 @@ async def process_dialogue(
             os.remove(os.path.join(temp_dir, f"part_{i}.srt"))
         except:
             pass
+    return cues
 
 def parse_dialogue_file(
     file_path: str, 
@@ -171,8 +193,9 @@ def merge_audio_and_srt_with_silence(
     part_count: int,
     output_audio: str,
     output_srt: str,
-    silence_duration_ms: int = 100
-) -> None:
+    silence_duration_ms: int = 100,
+    part_cues: Dict[int, Cues] = None
+) -> Cues:
     """
     合并多个音频和字幕文件，在音频间添加静音间隔
     
@@ -182,216 +205,655 @@ def merge_audio_and_srt_with_silence(
         output_audio: 输出音频路径
         output_srt: 输出字幕路径
         silence_duration_ms: 静音间隔时长(毫秒)
-    """
-    # 合并音频（带静音间隔）
-    silence = AudioSegment.silent(duration=silence_duration_ms)
-    combined_audio = None
-    first_audio = True
-    
-    for i in range(part_count):
-        audio_file = os.path.join(temp_dir, f"part_{i}.mp3")
-        
-        if not os.path.exists(audio_file):
-            continue
-            
-        audio = AudioSegment.from_mp3(audio_file)
-        
-        if combined_audio is None:
-            combined_audio = audio
-            first_audio = False
-        else:
-            combined_audio += silence + audio
-    
-    if combined_audio is not None:
-        combined_audio.export(output_audio, format="mp3")
-    
-    # 合并字幕并调整时间戳（考虑静音间隔）
-    with open(output_srt, 'w', encoding='utf-8') as out_srt:
-        total_duration = 0  # 毫秒
-        first_audio = True  # 标记是否是第一个音频
-        
-        for i in range(part_count):
-            audio_file = os.path.join(temp_dir, f"part_{i}.mp3")
-            srt_file = os.path.join(temp_dir, f"part_{i}.srt")
-            
-            if not os.path.exists(audio_file) or not os.path.exists(srt_file):
-                continue
-                
-            # 如果不是第一个音频，添加静音间隔时间
-            if not first_audio:
-                total_duration += silence_duration_ms
-            else:
-                first_audio = False
-                
-            # 读取并调整字幕
-            with open(srt_file, 'r', encoding='utf-8') as in_srt:
-                content = in_srt.read()
-                adjusted_content = adjust_srt_timestamps(content, total_duration)
-                out_srt.write(adjusted_content)
-                out_srt.write('\n')
-            
-            # 累加当前音频时长
-            audio = AudioSegment.from_mp3(audio_file)
-            total_duration += len(audio)
-
-def adjust_srt_timestamps(srt_content: str, offset_ms: int) -> str:
-    """
-    调整SRT字幕的时间戳
-    
-    Args:
-        srt_content: 原始SRT内容
-        offset_ms: 时间偏移量(毫秒)
+        part_cues: 分段序号 -> 已在内存中的分段字幕，缺少的分段从 part_{i}.srt 读取
         
     Returns:
-        调整后的SRT内容
+        合并后的字幕
     """
-    if offset_ms == 0:
-        return srt_content
-        
-    lines = srt_content.split('\n')
-    adjusted_lines = []
+    part_cues = part_cues or {}
     
-    for line in lines:
-        if '-->' in line:
-            # 这是时间轴行
-            parts = line.split('-->')
-            start, end = parts[0].strip(), parts[1].strip()
-            
-            # 调整时间
-            start = adjust_time(start, offset_ms)
-            end = adjust_time(end, offset_ms)
-            
-            line = f"{start} --> {end}"
-        
-        adjusted_lines.append(line)
+    # 每个分段只解码一次（并行起 ffmpeg），解码出的采样数即精确时长，用于拼接和字幕偏移
+    parts = [
+        (i, os.path.join(temp_dir, f"part_{i}.mp3"), os.path.join(temp_dir, f"part_{i}.srt"))
+        for i in range(part_count)
+        if os.path.exists(os.path.join(temp_dir, f"part_{i}.mp3"))
+    ]
+    if not parts:
+        save_srt(Cues(), output_srt)
+        return Cues()
     
-    return '\n'.join(adjusted_lines)
-
-def adjust_time(time_str: str, offset_ms: int) -> str:
-    """
-    调整单个时间戳
+    with ThreadPoolExecutor(max_workers=min(len(parts), os.cpu_count() or 1)) as executor:
+        pcm_parts = list(executor.map(decode_pcm, (audio_file for _, audio_file, _ in parts)))
     
-    Args:
-        time_str: 时间字符串 (HH:MM:SS,mmm)
-        offset_ms: 偏移量(毫秒)
-        
-    Returns:
-        调整后的时间字符串
-    """
-    # 解析时间
-    hh_mm_ss, ms = time_str.split(',')
-    hh, mm, ss = hh_mm_ss.split(':')
+    # 预分配整段 PCM 缓冲区一次性拷入，避免 AudioSegment 反复相加的二次方拷贝
+    silence_samples = silence_duration_ms * AUDIO_SAMPLE_RATE // 1000
+    total_samples = sum(len(pcm) for pcm in pcm_parts) + silence_samples * (len(parts) - 1)
+    buffer = np.zeros(total_samples, dtype=np.int16)  # 零值即静音
     
-    total_ms = (int(hh) * 3600 + int(mm) * 60 + int(ss)) * 1000 + int(ms)
-    total_ms += offset_ms
+    # 合并字幕并按记录的偏移整体平移时间戳（考虑静音间隔）
+    position = 0  # 采样
+    shifted = []
+    for index, ((i, _, srt_file), pcm) in enumerate(zip(parts, pcm_parts)):
+        if index > 0:
+            position += silence_samples
+        
+        cues = part_cues.get(i)
+        if cues is None and os.path.exists(srt_file):
+            cues = load_srt(srt_file)
+        if cues is not None:
+            shifted.append(cues.shift(round(position * 1000 / AUDIO_SAMPLE_RATE)))
+        
+        buffer[position:position + len(pcm)] = pcm
+        position += len(pcm)
     
-    # 转换回时间格式
-    new_ms = total_ms % 1000
-    total_seconds = total_ms // 1000
-    new_ss = total_seconds % 60
-    total_minutes = total_seconds // 60
-    new_mm = total_minutes % 60
-    new_hh = total_minutes // 60
+    merged = concat_cues(shifted)
+    save_srt(merged, output_srt)
     
-    return f"{new_hh:02d}:{new_mm:02d}:{new_ss:02d},{new_ms:03d}"
-
-# 定义将 SubRipTime 对象转换为秒数的函数
-def time2sec(subriptime):
-    return (
-        subriptime.hours * 3600 +
-        subriptime.minutes * 60 +
-        subriptime.seconds +
-        subriptime.milliseconds / 1000.0
+    # 整段只编码一次
+    encode_pcm(buffer, output_audio)
+    return merged
+
+# edge-tts 输出为 24kHz 单声道，合并时统一解码到该格式
+AUDIO_SAMPLE_RATE = 24000
+
+def decode_pcm(audio_file, sample_rate=AUDIO_SAMPLE_RATE):
+    """用 ffmpeg 把音频解码为单声道 int16 PCM 数组"""
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', audio_file, '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+def encode_pcm(pcm, output_audio, sample_rate=AUDIO_SAMPLE_RATE):
+    """把单声道 int16 PCM 从管道送入 ffmpeg 编码为 MP3"""
+    subprocess.run(
+        ['ffmpeg', '-y', '-v', 'error', '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), '-i', '-',
+         '-c:a', 'libmp3lame', output_audio],
+        input=pcm.tobytes(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True
     )
 
 # 定义合并字幕条目的函数
-def merge_subtitles(srt, max_duration_s) -> None:
-    subtitles = pysrt.open(srt)
-    merged_subtitles = []
-    current_sub = None
-
-    for sub in subtitles:
-        if current_sub is None:
-            current_sub = sub
-        else:
-            # 计算当前字幕条目的开始时间和结束时间
-            start_time = time2sec(sub.start)
-            end_time = time2sec(sub.end)
-               
-            # 计算上一个字幕条目的结束时间
-            current_start_time = time2sec(current_sub.start)
-            current_end_time = time2sec(current_sub.end)
-        
-            # 如果当前字幕条目的开始时间与上一个条目的结束时间相差不超过 0.1 秒，
-            # 并且合并后的时间跨度不超过 max_duration_s 秒，
-            # 则合并这两个条目。
-            if start_time - current_end_time <= 0.1 and (end_time - current_start_time) <= max_duration_s:
-                current_sub.end = sub.end
-                current_sub.text = current_sub.text.strip() + "" + sub.text.strip()
-            else:
-                # 否则，将当前合并的字幕条目添加到结果列表中，并开始新的字幕条目。
-                merged_subtitles.append(current_sub)
-                current_sub = sub
-                
-    # 添加最后一个字幕条目
-    if current_sub:
-        merged_subtitles.append(current_sub)
-    
-    # 将合并后的字幕条目列表转换为 SubRipFile 对象
-    merged_subrip_file = pysrt.SubRipFile(merged_subtitles)
-    # 保存合并后的字幕到新的 .srt 文件
-    merged_subrip_file.save(srt, encoding="utf-8")
+def merge_subtitles(srt, max_duration_s, cues=None, **layout) -> Cues:
+    """合并相邻的短字幕（间隔不超过 0.1 秒且合并后不超过 max_duration_s 秒），写回 srt 并返回合并结果；
+    传入 cues 时直接使用内存中的字幕，不再读取 srt；layout 为排版约束（见 subtitle_layout），
+    给出时按渲染宽度装箱，保证合并后的字幕不超出画面"""
+    if cues is None:
+        cues = load_srt(srt)
+    merged = merge_cues(cues, max_duration_s, **layout)
+    save_srt(merged, srt)
+    return merged
+
+# ===== 字体与字形缓存 =====
+# 每个进程内字体只解析一次；文本贴图按 (字体, 字号, 文本, 颜色, 描边) 做 LRU 缓存，
+# 重复的标题和字幕不再重新排版绘制。贴图大小随档位差别很大（high 档一条约 0.5MB），按总字节数限容
+TEXT_SPRITE_CACHE_BYTES = 32 * 1024 * 1024
+
+@lru_cache(maxsize=32)
+def get_font(font_path, size):
+    """按路径和字号取字体（进程内缓存）"""
+    return ImageFont.truetype(str(font_path), size)
+
+@lru_cache(maxsize=8192)
+def char_advance(font_path, size, char):
+    """单个字符的排版宽度（像素），按字体/字号/字符缓存"""
+    return get_font(font_path, size).getlength(char)
+
+def text_width(font_path, size, text):
+    """按缓存的字符宽度累加估算单行文本宽度，中文字体无字偶距调整，与实际排版一致"""
+    return sum(char_advance(font_path, size, char) for char in text)
+
+def subtitle_layout(font_path=None, font_size=None, max_width=None):
+    """字幕排版约束（供 merge_subtitles / create_video_streaming 使用）
+
+    宽度按 1080 宽画面、100 号字（create_video_* 中字号与画面同比例缩放）计算，
+    因此与实际渲染档位无关；默认取 Config 中的字幕排版参数。
+    """
+    font_path = str(font_path or Config.VIDEO_FONT_DIR / 'ceym.ttf')
+    font_size = font_size or 100
+    return {
+        'measure': lambda text: text_width(font_path, font_size, text),
+        'max_width': max_width or Config.SCREEN_SIZE[0] * Config.SUB_MAX_WIDTH_RATIO,
+        'max_chars': Config.SUB_MAX_CHARS,
+        'max_lines': Config.SUB_MAX_LINES,
+    }
+
+def _font_key(font):
+    """可缓存字体的键 (路径, 字号)；从内存加载的字体（如默认字体）返回 None"""
+    path = getattr(font, "path", None)
+    if isinstance(path, (str, Path)):
+        return str(path), font.size
+    return None
+
+def _layout_text_sprite(font, text, color, stroke, stroke_color):
+    """排版并绘制文本贴图，返回 (BGRA贴图, 不含描边的包围盒, 含描边的包围盒左上角)"""
+    probe = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    # 多行字幕（segment 折行）各行居中
+    # 多行时 Pillow 返回浮点包围盒，向外取整
+    layout_bbox = tuple(math.floor(v) if i < 2 else math.ceil(v) for i, v in enumerate(probe.textbbox((0, 0), text, font=font, align="center")))
+    left, top, right, bottom = (math.floor(v) if i < 2 else math.ceil(v) for i, v in enumerate(probe.textbbox((0, 0), text, font=font, stroke_width=stroke, align="center")))
+
+    sprite = Image.new("RGBA", (max(right - left, 1), max(bottom - top, 1)), (0, 0, 0, 0))
+    ImageDraw.Draw(sprite).text(
+        (-left, -top),
+        text,
+        font=font,
+        fill=color[::-1],
+        stroke_width=stroke,
+        stroke_fill=stroke_color[::-1] if stroke else None,
+        align="center"
+    )
+    sprite = cv2.cvtColor(np.asarray(sprite), cv2.COLOR_RGBA2BGRA)
+    sprite.setflags(write=False)  # 缓存共享，只读
+    return sprite, layout_bbox, (left, top)
+
+class SpriteCache:
+    """按总字节数限容的贴图 LRU 缓存（线程安全），超出上限时淘汰最久未用的贴图"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """取缓存的 (贴图, 包围盒, 左上角)，未命中时调用 build() 生成并放入缓存"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = build()
+        size = entry[0].nbytes
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = entry
+                self.total += size
+                while self.total > self.max_bytes:
+                    _, (old_sprite, _, _) = self._entries.popitem(last=False)
+                    self.total -= old_sprite.nbytes
+        return entry
+
+_sprite_cache = SpriteCache(TEXT_SPRITE_CACHE_BYTES)
+
+def _cached_text_sprite(font_path, font_size, text, color, stroke, stroke_color):
+    return _sprite_cache.get(
+        (font_path, font_size, text, color, stroke, stroke_color),
+        lambda: _layout_text_sprite(get_font(font_path, font_size), text, color, stroke, stroke_color)
+    )
 
 def draw_text_on_frame(frame, text, font, color, position, screen_size, stroke_width, stroke_color, use_shadow):
-    """（高低配都调用）在视频帧上绘制文本"""
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    frame_pil = Image.fromarray(frame_rgb)
-    draw = ImageDraw.Draw(frame_pil)
+    """（高低配都调用）在视频帧上绘制文本，返回新帧（字形贴图走进程级缓存）"""
+    sprite, origin = render_text_sprite(text, font, color, position, screen_size, stroke_width, stroke_color, use_shadow)
+    return composite_sprite(frame.copy(), sprite, origin)
 
-    text_bbox = draw.textbbox((0, 0), text, font=font)
+def text_origin(text_bbox, position, screen_size):
+    """根据文本包围盒和位置参数计算绘制原点（center/middle 为居中）"""
     text_width = text_bbox[2] - text_bbox[0]
     text_height = text_bbox[3] - text_bbox[1]
-    
+
     if isinstance(position[0], str) and position[0].lower() == "center":
         x = (screen_size[0] - text_width) // 2
     else:
         x = position[0]
-    
+
     if isinstance(position[1], str) and position[1].lower() == "middle":
         y = (screen_size[1] - text_height) // 2
         y -= text_bbox[1]
     else:
         y = position[1]
+    return x, y
+
+def render_text_sprite(text, font, color, position, screen_size, stroke_width, stroke_color, use_shadow):
+    """把文本预渲染为BGRA贴图（alpha为字形蒙版），返回贴图及其在画面中的左上角坐标"""
+    stroke = stroke_width if use_shadow else 0
+    font_key = _font_key(font)
+    if font_key:
+        sprite, layout_bbox, (left, top) = _cached_text_sprite(
+            *font_key, text, tuple(color), stroke, tuple(stroke_color) if stroke else None
+        )
+    else:
+        sprite, layout_bbox, (left, top) = _layout_text_sprite(font, text, color, stroke, stroke_color)
+
+    # 定位沿用不含描边的包围盒，与直接在帧上绘制时的位置一致
+    x, y = text_origin(layout_bbox, position, screen_size)
+    return sprite, (x + left, y + top)
+
+def composite_sprite(frame, sprite, origin):
+    """按alpha把BGRA贴图叠加到BGR帧上（原地修改，超出画面部分裁掉）"""
+    height, width = frame.shape[:2]
+    x, y = origin
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite.shape[1], width), min(y + sprite.shape[0], height)
+    if x0 >= x1 or y0 >= y1:
+        return frame
+
+    patch = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+    alpha = patch[..., 3:4].astype(np.uint16)
+    region = frame[y0:y1, x0:x1]
+    region[:] = ((patch[..., :3] * alpha + region * (255 - alpha) + 127) // 255).astype(np.uint8)
+    return frame
+
+class StaticLayerCompositor:
+    """静态图层合成器
+
+    标题层只绘制一次；每条不同的字幕文本只渲染一次贴图，
+    字幕区间内的所有帧直接复用同一份帧字节，逐帧只剩一次缓冲区写入。
+    """
 
-    draw.text(
-        (x, y),
-        text,
-        font=font,
-        fill=color[::-1],
-        stroke_width=stroke_width if use_shadow else 0,
-        stroke_fill=stroke_color[::-1] if use_shadow else None
+    def __init__(self, base_frame, font, color, position, screen_size, stroke_width, stroke_color, use_shadow):
+        self.base_frame = base_frame
+        self.base_bytes = base_frame.tobytes()
+        self.font = font
+        self.color = color
+        self.position = position
+        self.screen_size = screen_size
+        self.stroke_width = stroke_width
+        self.stroke_color = stroke_color
+        self.use_shadow = use_shadow
+        self._sprites = {}
+        self._current_text = None
+        self._current_bytes = self.base_bytes
+
+    def sprite(self, text):
+        """取出（必要时渲染）字幕贴图"""
+        if text not in self._sprites:
+            self._sprites[text] = render_text_sprite(
+                text=text,
+                font=self.font,
+                color=self.color,
+                position=self.position,
+                screen_size=self.screen_size,
+                stroke_width=self.stroke_width,
+                stroke_color=self.stroke_color,
+                use_shadow=self.use_shadow
+            )
+        return self._sprites[text]
+
+    def compose(self, text):
+        """合成一帧完整画面（标题层 + 字幕贴图）"""
+        return self.compose_into(text, self.base_frame.copy())
+
+    def compose_into(self, text, out):
+        """在给定缓冲区上原地合成一帧（out 需与标题层同尺寸）"""
+        if out is not self.base_frame:
+            np.copyto(out, self.base_frame)
+        if text:
+            sprite, origin = self.sprite(text)
+            composite_sprite(out, sprite, origin)
+        return out
+
+    def frame_bytes(self, text):
+        """返回当前字幕对应的帧字节，字幕未变化时直接复用上一帧"""
+        if not text:
+            return self.base_bytes
+        if text != self._current_text:
+            self._current_text = text
+            self._current_bytes = self.compose(text).tobytes()
+        return self._current_bytes
+
+class CueIndex:
+    """字幕区间索引
+
+    按开始时间排序并裁掉重叠部分（重叠时先出现的字幕优先），
+    单点查询用二分 O(log n)，整段视频用 NumPy 一次性生成逐帧查找表 O(1)。
+    """
+
+    def __init__(self, sub_times):
+        self.starts = []
+        self.ends = []
+        self.texts = []
+        cursor = 0.0
+
+        for start, end, text in sorted(sub_times, key=lambda cue: cue[0]):
+            start = max(start, cursor)
+            if end <= start:
+                continue
+            self.starts.append(start)
+            self.ends.append(end)
+            self.texts.append(text)
+            cursor = end
+
+    def __len__(self):
+        return len(self.texts)
+
+    def lookup(self, t):
+        """返回时间t(秒)处的字幕文本，没有字幕时返回None"""
+        i = bisect.bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.ends[i]:
+            return self.texts[i]
+        return None
+
+    def frame_lookup(self, total_frames, fps):
+        """生成逐帧字幕下标数组（-1 表示无字幕），判定条件与逐帧渲染一致：start <= i/fps < end"""
+        frame_times = np.arange(total_frames) / fps
+        if not self.texts:
+            return np.full(total_frames, -1, dtype=np.int32)
+
+        idx = np.searchsorted(np.asarray(self.starts), frame_times, side='right') - 1
+        active = (idx >= 0) & (frame_times < np.asarray(self.ends)[idx.clip(min=0)])
+        return np.where(active, idx, -1).astype(np.int32)
+
+    def frame_texts(self, total_frames, fps):
+        """逐帧字幕文本列表（无字幕为None），供顺序渲染循环直接迭代"""
+        texts = self.texts + [None]  # 下标-1 正好取到 None
+        return [texts[i] for i in self.frame_lookup(total_frames, fps).tolist()]
+
+def build_cue_timeline(sub_times, total_duration, fps):
+    """把字幕区间整理为首尾相接的画面片段 [(起始帧, 结束帧, 字幕文本或None)]
+
+    由 CueIndex 的逐帧查找表做游程合并得到，与逐帧渲染的结果逐帧一致。
+    """
+    cue_index = CueIndex(sub_times)
+    lookup = cue_index.frame_lookup(int(total_duration * fps), fps)
+    if not len(lookup):
+        return []
+
+    texts = cue_index.texts + [None]
+    bounds = [0, *(np.flatnonzero(np.diff(lookup)) + 1).tolist(), len(lookup)]
+    segments = []
+    for start_frame, end_frame in zip(bounds[:-1], bounds[1:]):
+        text = texts[lookup[start_frame]]
+        if segments and segments[-1][2] == text:
+            segments[-1] = (segments[-1][0], end_frame, text)
+        else:
+            segments.append((start_frame, end_frame, text))
+    return segments
+
+def _first_frame_at(t, fps):
+    """满足 i/fps >= t 的最小帧号（与 frame_lookup 的浮点判定一致）"""
+    i = max(math.ceil(t * fps), 0)
+    while i > 0 and (i - 1) / fps >= t:
+        i -= 1
+    while i / fps < t:
+        i += 1
+    return i
+
+def stream_cue_timeline(cues, fps):
+    """build_cue_timeline 的流式版本：cues 为按时间顺序陆续到达、互不重叠的 (开始秒, 结束秒, 文本)
+    （edge-tts 的逐词时间轴满足这一点），边到达边产出画面片段；视频总长取最后一条字幕的结束时间
+    （同 create_video_* 中的 duration），结果与 build_cue_timeline 逐帧一致"""
+    cursor = 0.0
+    frame = 0
+    last_end = 0.0
+    pending = None  # 暂存最后一个片段：可能与下一个同文本片段合并，也要按最终总帧数截断
+
+    def emit(segment):
+        nonlocal pending
+        if segment[1] <= segment[0]:
+            return
+        if pending and pending[2] == segment[2]:
+            pending = (pending[0], segment[1], segment[2])
+            return
+        if pending:
+            yield pending
+        pending = segment
+
+    for start, end, text in cues:
+        last_end = end
+        start = max(start, cursor)
+        if end <= start:
+            continue
+        cursor = end
+        start_frame, end_frame = max(_first_frame_at(start, fps), frame), _first_frame_at(end, fps)
+        yield from emit((frame, start_frame, None))
+        yield from emit((start_frame, end_frame, text))
+        frame = max(frame, end_frame)
+
+    total_frames = int(last_end * fps)
+    yield from emit((frame, total_frames, None))
+    if pending and pending[0] < total_frames:
+        yield (pending[0], min(pending[1], total_frames), pending[2])
+
+def timeline_limit(segments, fps):
+    """静帧模式的输出时长上限：清单末尾重复的那张静帧会被分离器按默认时长多播一帧，用 -t 截到时间轴长度"""
+    return ['-t', f"{segments[-1][1] / fps:.6f}"] if segments else []
+
+def write_cue_stills(segments, compositor, still_dir, fps):
+    """每个画面片段只输出一张静帧，并写出带显式时长的 ffconcat 清单，返回清单路径"""
+    stills = {}
+    lines = ["ffconcat version 1.0"]
+
+    for start_frame, end_frame, text in segments:
+        if text not in stills:
+            still_name = f"still_{len(stills)}.png"
+            cv2.imwrite(os.path.join(still_dir, still_name), compositor.compose(text), [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            stills[text] = still_name
+        lines.append(f"file '{stills[text]}'")
+        lines.append(f"duration {(end_frame - start_frame) / fps:.6f}")
+
+    # concat 分离器会忽略最后一条的时长，需再列一次最后一张静帧（多出的一帧由 timeline_limit 截掉）
+    if segments:
+        lines.append(f"file '{stills[segments[-1][2]]}'")
+
+    concat_path = os.path.join(still_dir, "stills.ffconcat")
+    with open(concat_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return concat_path
+
+# ===== 帧环与写线程 =====
+class FrameRing:
+    """预分配的有界帧环
+
+    渲染方原地填充空闲槽位后发布，写线程按发布顺序把槽位内存直接写给 ffmpeg
+    （不经过 tobytes 复制），写完再归还槽位。所有槽位都在途时 acquire 会阻塞，
+    编码跟不上时渲染自然被限速，长视频内存占用恒定。shared=True 时槽位放在共享内存，
+    可由其它进程填充。
+    """
+
+    def __init__(self, frame_shape, slots=3, shared=False):
+        self.frame_shape = tuple(frame_shape)
+        self.slots = slots
+        self.frame_size = int(np.prod(self.frame_shape))
+        self._shm = None
+        if shared:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.frame_size * slots)
+            self._frames = np.ndarray((slots, *self.frame_shape), dtype=np.uint8, buffer=self._shm.buf)
+        else:
+            self._frames = np.empty((slots, *self.frame_shape), dtype=np.uint8)
+
+        self._free = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._ready = queue.Queue()
+        self._writer = None
+        self._error = None
+
+    @property
+    def name(self):
+        """共享内存名（仅 shared=True 时有效）"""
+        return self._shm.name if self._shm else None
+
+    def frame(self, slot):
+        return self._frames[slot]
+
+    def acquire(self):
+        """取一个空闲槽位，写线程出错时抛出其异常"""
+        while True:
+            if self._error:
+                raise self._error
+            try:
+                return self._free.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def publish(self, slot, repeat=1):
+        """发布已填充的槽位，写线程会把它连续写出 repeat 次"""
+        self._ready.put((slot, repeat))
+
+    def start_writer(self, stream):
+        self._writer = threading.Thread(target=self._drain, args=(stream,), daemon=True)
+        self._writer.start()
+
+    def _drain(self, stream):
+        while True:
+            item = self._ready.get()
+            if item is None:
+                return
+            slot, repeat = item
+            try:
+                frame_view = self._frames[slot].data
+                for _ in range(repeat):
+                    stream.write(frame_view)
+            except Exception as e:
+                self._error = e
+                return
+            finally:
+                self._free.put(slot)
+
+    def finish(self):
+        """等待写线程写完所有已发布的帧"""
+        if self._writer:
+            self._ready.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._error:
+            raise self._error
+
+    def close(self):
+        if self._writer:
+            self._ready.put(None)
+            self._writer.join()
+            self._writer = None
+        self._frames = None
+        if self._shm:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def stream_segments(segments, compositor, stream, slots=3):
+    """单进程：把每个画面片段原地合成到帧环，由写线程按帧数重复写入 stream"""
+    with FrameRing(compositor.base_frame.shape, slots) as ring:
+        ring.start_writer(stream)
+        for start_frame, end_frame, text in segments:
+            slot = ring.acquire()
+            compositor.compose_into(text, ring.frame(slot))
+            ring.publish(slot, end_frame - start_frame)
+        ring.finish()
+
+# ===== 多进程渲染后端 =====
+# 每个工作进程只在启动时挂接一次共享内存中的标题层和帧环，字体也只加载一次
+_render_worker = {}
+
+def _load_font(font_spec):
+    """font_spec 为 (字体路径, 字号)，为 None 时使用 PIL 默认字体"""
+    if font_spec is None:
+        return ImageFont.load_default()
+    return get_font(font_spec[0], font_spec[1])
+
+def _init_render_worker(base_name, ring_name, frame_shape, slot_count, font_spec, style):
+    base_shm = shared_memory.SharedMemory(name=base_name)
+    ring_shm = shared_memory.SharedMemory(name=ring_name)
+    base_frame = np.ndarray(frame_shape, dtype=np.uint8, buffer=base_shm.buf)
+    _render_worker.update(
+        shms=(base_shm, ring_shm),
+        ring=np.ndarray((slot_count, *frame_shape), dtype=np.uint8, buffer=ring_shm.buf),
+        compositor=StaticLayerCompositor(base_frame, _load_font(font_spec), *style)
     )
-    return cv2.cvtColor(np.array(frame_pil), cv2.COLOR_RGB2BGR)
+
+def _render_into_slot(slot, text):
+    """工作进程：把一个画面片段合成到帧环的指定槽位"""
+    _render_worker['compositor'].compose_into(text, _render_worker['ring'][slot])
+    return slot
+
+class ParallelFrameRenderer:
+    """多进程帧渲染器
+
+    标题层放入共享内存，工作进程启动时挂接一次；每个画面片段（一条字幕）
+    由工作进程直接合成到共享帧环（FrameRing）的槽位中，父进程按时间顺序发布槽位，
+    写线程把同一块内存按片段帧数重复写给 ffmpeg。槽位用尽时不再派发任务，内存占用有上限。
+    """
+
+    def __init__(self, base_frame, font_spec, color, position, screen_size, stroke_width, stroke_color, use_shadow, workers=None, slots=None):
+        self.frame_shape = base_frame.shape
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = slots or self.workers * 2
+        self.font_spec = font_spec
+        self.style = (color, position, screen_size, stroke_width, stroke_color, use_shadow)
+
+        self._base_shm = shared_memory.SharedMemory(create=True, size=base_frame.nbytes)
+        np.ndarray(self.frame_shape, dtype=np.uint8, buffer=self._base_shm.buf)[:] = base_frame
+        self.ring = FrameRing(self.frame_shape, self.slots, shared=True)
+
+    def stream(self, segments, stream):
+        """按顺序渲染所有画面片段并写入 stream（通常是 ffmpeg 的 stdin）"""
+        pending = deque()
+        queued = iter(segments)
+        self.ring.start_writer(stream)
+
+        # 不用 fork：Flask 进程里已有浏览器池、编码器探测、语音合成等线程，fork 时它们持有的锁会被复制进子进程导致死锁
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'),
+            initializer=_init_render_worker,
+            initargs=(self._base_shm.name, self.ring.name, self.frame_shape, self.slots, self.font_spec, self.style)
+        ) as pool:
+            def submit():
+                segment = next(queued, None)
+                if segment is not None:
+                    slot = self.ring.acquire()
+                    pending.append((segment, pool.submit(_render_into_slot, slot, segment[2])))
+
+            for _ in range(self.slots):
+                submit()
+
+            while pending:
+                (start_frame, end_frame, _), future = pending.popleft()
+                self.ring.publish(future.result(), end_frame - start_frame)
+                submit()
+
+        self.ring.finish()
+
+    def close(self):
+        self.ring.close()
+        self._base_shm.close()
+        self._base_shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+_last_cue_index = (None, None)  # (sub_times 列表, CueIndex)，逐帧调用时同一列表只建一次索引
+
+def _cue_index_for(sub_times):
+    """列表形式的字幕区间 -> CueIndex；同一个列表对象连续调用时直接复用（列表在渲染期间不应被修改）"""
+    global _last_cue_index
+    if isinstance(sub_times, CueIndex):
+        return sub_times
+    cached_list, cue_index = _last_cue_index
+    if cached_list is not sub_times:
+        cue_index = CueIndex(sub_times)
+        _last_cue_index = (sub_times, cue_index)
+    return cue_index
 
 def render_frame(args):
     """修改后支持动态帧率的版本"""
     frame_idx, sub_times, bg_with_title, screen_size, font, text_color, position, stroke_width, stroke_color, use_shadow, fps = args 
     frame_time = frame_idx / fps 
     frame = bg_with_title.copy()
-    
-    for start, end, text in sub_times:
-        if start <= frame_time < end:
-            frame = draw_text_on_frame(
-                frame=frame,
-                text=text,
-                font=font,
-                color=text_color,
-                position=position,
-                screen_size=screen_size,
-                stroke_width=stroke_width,
-                stroke_color=stroke_color,
-                use_shadow=use_shadow
-            )
+
+    # sub_times 可直接传入预先构建好的 CueIndex；传入列表时按对象身份复用上次构建的索引
+    cue_index = _cue_index_for(sub_times)
+    text = cue_index.lookup(frame_time)
+    if text:
+        frame = draw_text_on_frame(
+            frame=frame,
+            text=text,
+            font=font,
+            color=text_color,
+            position=position,
+            screen_size=screen_size,
+            stroke_width=stroke_width,
+            stroke_color=stroke_color,
+            use_shadow=use_shadow
+        )
     return frame.tobytes()
 
 # 高低配都调用生成拼色背景
@@ -407,39 +869,55 @@ def create_gradient_background(width, height):
     bg[height*3//4:, :] = CANVAS_COLOR
     return bg
 
-def create_video_multi(srt_filename, audio_filename, output_filename, screen_size, title_txt):
-    """多线程版本"""
+def get_render_profile(profile):
+    """按名称取渲染档位（draft/standard/high），也可直接传入档位字典"""
+    if isinstance(profile, dict):
+        return profile
+    if profile not in Config.RENDER_PROFILES:
+        raise ValueError(f"未知渲染档位: {profile}")
+    return Config.RENDER_PROFILES[profile]
+
+def create_video_multi(srt_filename, audio_filename, output_filename, screen_size, title_txt, render_mode=None, workers=None, encoder=None, profile="high", cues=None, work_dir=None):
+    """多进程版本（render_mode: frames 逐帧管道 / stills 每条字幕一张静帧，默认跟随渲染档位；
+    workers 默认取CPU核数；encoder 为 select_encoder 的返回值，默认按档位自动选择；
+    profile 为 Config.RENDER_PROFILES 中的渲染档位名）"""
     start_time = time.time()
     try:
-        # 核心参数配置
-        FPS = 24
-        TITLE_FONT_SIZE = 85
+        # 核心参数配置（分辨率/帧率/编码参数来自渲染档位，字号按 1080 宽设计并随分辨率缩放）
+        PROFILE = get_render_profile(profile)
+        SCALE = PROFILE['scale']
+        PROCESS_SIZE = (int(screen_size[0] * SCALE), int(screen_size[1] * SCALE))
+        FPS = PROFILE['fps']
+        TITLE_FONT_SIZE = int(85 * SCALE)
         TITLE_COLOR = (93, 20, 0) # 蓝黑 BGR(171, 229, 243)金色
         TITLE_STROKE_COLOR = (200, 200, 200) # 灰色
         TITLE_STROKE_WIDTH = 2
-        TITLE_Y = int(screen_size[1] * 0.5) #250
-        SUB_FONT_SIZE = 100
+        TITLE_Y = int(PROCESS_SIZE[1] * 0.5) #250
+        SUB_FONT_SIZE = int(100 * SCALE)
         SUB_COLOR = (0, 0, 255) # 红色 BGR(171, 229, 243)金色
         SUB_STROKE_COLOR = (0, 0, 0)
         SUB_STROKE_WIDTH = 2
         SUB_POSITION = ("center", "middle")
         SUB_USE_SHADOW = False
 
-        subs = pysrt.open(srt_filename, encoding='utf-8')
-        sub_times = [(time2sec(sub.start), time2sec(sub.end), sub.text) for sub in subs]
-        audio = AudioSegment.from_file(audio_filename)
-        total_duration = max(time2sec(subs[-1].end), len(audio)/1000)
+        cues = cues if cues is not None else load_srt(srt_filename)
+        sub_times = cues.sub_times()
+        # 音频时长按 MP3 帧头累加得到（不解码、不依赖 pydub/ffprobe），单位 100ns
+        with open(audio_filename, 'rb') as f:
+            total_duration = max(cues.duration, mp3_duration(f.read()) / 10_000_000)
 
         # 生成拼色背景
-        bg_image = create_gradient_background(screen_size[0], screen_size[1])
+        bg_image = create_gradient_background(PROCESS_SIZE[0], PROCESS_SIZE[1])
 
         try:
             font_path = current_app.config['VIDEO_FONT_DIR'] / 'ceym.ttf'
-            font_title = ImageFont.truetype(font_path, TITLE_FONT_SIZE)
-            font_sub = ImageFont.truetype(font_path, SUB_FONT_SIZE)
+            font_title = get_font(font_path, TITLE_FONT_SIZE)
+            font_sub = get_font(font_path, SUB_FONT_SIZE)
+            font_sub_spec = (font_path, SUB_FONT_SIZE)
         except:
             font_title = ImageFont.load_default()
             font_sub = ImageFont.load_default()
+            font_sub_spec = None
 
         bg_with_title = draw_text_on_frame(
             frame=bg_image,
@@ -447,50 +925,82 @@ def create_video_multi(srt_filename, audio_filename, output_filename, screen_siz
             font=font_title,
             color=TITLE_COLOR,
             position=("center", TITLE_Y),
-            screen_size=screen_size,
+            screen_size=PROCESS_SIZE,
             stroke_width=TITLE_STROKE_WIDTH,
             stroke_color=TITLE_STROKE_COLOR,
             use_shadow=False
         )
 
+        # 字幕贴图只渲染一次，字幕区间内复用同一帧
+        compositor = StaticLayerCompositor(
+            base_frame=bg_with_title,
+            font=font_sub,
+            color=SUB_COLOR,
+            position=SUB_POSITION,
+            screen_size=PROCESS_SIZE,
+            stroke_width=SUB_STROKE_WIDTH,
+            stroke_color=SUB_STROKE_COLOR,
+            use_shadow=SUB_USE_SHADOW
+        )
+
+        render_mode = render_mode or PROFILE.get('render_mode', 'frames')
+        if render_mode == "stills":
+            # 每条字幕只输出一张静帧，由 ffconcat 给出时长，按可变帧率编码
+            still_dir = tempfile.mkdtemp(prefix="stills_", dir=work_dir)
+            segments = build_cue_timeline(sub_times, total_duration, FPS)
+            video_input = ['-f', 'concat', '-safe', '0', '-i', write_cue_stills(segments, compositor, still_dir, FPS)]
+            frame_sync = ['-fps_mode', 'vfr', *timeline_limit(segments, FPS)]
+        else:
+            video_input = [
+                '-f', 'rawvideo',
+                '-vcodec', 'rawvideo',
+                '-s', f'{PROCESS_SIZE[0]}x{PROCESS_SIZE[1]}',
+                '-pix_fmt', 'bgr24',
+                '-r', str(FPS),
+                '-i', '-'
+            ]
+            frame_sync = []
+
         # FFmpeg参数
+        # 编码器由注册表按本机能力选择（QSV/NVENC/VAAPI 优先，不可用时回退到 libx264）
+        encoder = encoder or select_encoder(PROFILE['speed'], PROFILE['quality'])
+        print(f"视频编码器: {encoder['name']}")
+
         cmd = [
         'ffmpeg', '-y',
+        *encoder['input_args'],
         '-thread_queue_size', '2048',
-        '-f', 'rawvideo',
-        '-vcodec', 'rawvideo',
-        '-s', f'{screen_size[0]}x{screen_size[1]}',
-        '-pix_fmt', 'bgr24',
-        '-r', '24',
-        '-i', '-',
+        *video_input,
         '-i', str(audio_filename),  # 确保路径是字符串
-        '-preset', 'fast',
-        # '-c:v', 'h264_nvenc',          # 改用 NVIDIA NVENC 编码 
-        # '-pix_fmt', 'nv12',            # NVENC 推荐格式（原 yuv420p）
-        # '-cq', '23',                   # NVENC 质量参数（原 global_quality）
-        # '-rc', 'vbr',                  # NVIDIA新增：码率控制模式（可变码率）
-        # '-b:v', '0',                   # NVIDIA新增：自动码率（基于 cq 值）
-        '-c:v', 'h264_qsv',           # Intel 加速
-        '-pix_fmt', 'yuv420p',        # Intel 默认格式
-        '-global_quality', '23',      # Intel 编码质量参数
+        *encoder['output_args'],
         '-c:a', 'aac',
+        *frame_sync,
         '-metadata', f'title={title_txt}',
         '-metadata', 'encoder=FFmpeg',
         str(output_filename)  # 确保路径是字符串
     ]
 
-        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor, \
-             subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) as process:
-            
-            # 在 create_video_multi 中构建参数时加入 fps
-            frame_args = [
-                (i, sub_times, bg_with_title, screen_size, font_sub, 
-                SUB_COLOR, SUB_POSITION, SUB_STROKE_WIDTH, SUB_STROKE_COLOR, SUB_USE_SHADOW, FPS)  # 新增 FPS
-                for i in range(int(total_duration * FPS))  # 这里也使用 FPS 替代硬编码值
-            ]
-            
-            for frame_data in executor.map(render_frame, frame_args):
-                process.stdin.write(frame_data)
+        if render_mode == "stills":
+            try:
+                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            finally:
+                shutil.rmtree(still_dir, ignore_errors=True)
+        else:
+            workers = workers or os.cpu_count() or 1
+            with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) as process:
+                if workers > 1:
+                    # 多进程渲染：标题层经共享内存下发，各进程并行合成字幕帧
+                    with ParallelFrameRenderer(
+                        bg_with_title, font_sub_spec, SUB_COLOR, SUB_POSITION, PROCESS_SIZE,
+                        SUB_STROKE_WIDTH, SUB_STROKE_COLOR, SUB_USE_SHADOW, workers=workers
+                    ) as renderer:
+                        renderer.stream(build_cue_timeline(sub_times, total_duration, FPS), process.stdin)
+                else:
+                    stream_segments(build_cue_timeline(sub_times, total_duration, FPS), compositor, process.stdin)
+
+                process.stdin.close()
+                if process.wait() != 0:
+                    raise RuntimeError(f"视频编码失败，ffmpeg 返回码 {process.returncode}")
 
         print(f"视频生成完成 | 耗时: {time.time()-start_time:.1f}秒")
 
@@ -498,28 +1008,32 @@ def create_video_multi(srt_filename, audio_filename, output_filename, screen_siz
         print(f"错误: {str(e)}")
         raise
 
-def create_video_single(srt_filename, audio_filename, output_filename, screen_size, title_txt):
-    """单线程版本"""
+def create_video_single(srt_filename, audio_filename, output_filename, screen_size, title_txt, render_mode=None, workers=1, encoder=None, profile="standard", cues=None, work_dir=None):
+    """单线程版本（render_mode: frames 逐帧管道 / stills 每条字幕一张静帧，默认跟随渲染档位；
+    workers>1 时启用多进程渲染；encoder 为 select_encoder 的返回值，默认按档位自动选择；
+    profile 为 Config.RENDER_PROFILES 中的渲染档位名；work_dir 为任务工作区，中间文件放在其中）"""
     start_time = time.time()
     try:
-        # 核心参数配置
-        SCALE = 640 / 1080  # 直接使用分数关系
-        PROCESS_SIZE = (int(screen_size[0] * SCALE), int(screen_size[1] * SCALE)) # PROCESS_SIZE = (640, 1136)
-        FPS = 18
-        TITLE_FONT_SIZE = 50
+        # 核心参数配置（分辨率/帧率/编码参数来自渲染档位，字号按 1080 宽设计并随分辨率缩放）
+        PROFILE = get_render_profile(profile)
+        SCALE = PROFILE['scale']
+        PROCESS_SIZE = (int(screen_size[0] * SCALE), int(screen_size[1] * SCALE)) # standard: (640, 1220)
+        FPS = PROFILE['fps']
+        TITLE_FONT_SIZE = int(85 * SCALE)
         TITLE_COLOR = (93, 20, 0)
         TITLE_STROKE_COLOR = (200, 200, 200)
         TITLE_STROKE_WIDTH = 2
         TITLE_Y = int(PROCESS_SIZE[1] * 0.5) # int(PROCESS_SIZE[1] * 0.13)
-        SUB_FONT_SIZE = 59
+        SUB_FONT_SIZE = int(100 * SCALE)
         SUB_COLOR = (171, 229, 243)
         SUB_STROKE_COLOR = (0, 0, 0)
         SUB_STROKE_WIDTH = 0
         SUB_POSITION = ("center", "middle")
         SUB_USE_SHADOW = False
 
-        subs = pysrt.open(srt_filename, encoding='utf-8')
-        sub_times = [(time2sec(sub.start), time2sec(sub.end), sub.text) for sub in subs]
+        # 上一阶段传入的字幕直接使用，否则读取 SRT 文件
+        cues = cues if cues is not None else load_srt(srt_filename)
+        sub_times = cues.sub_times()
 
         # 生成拼色背景
         bg = create_gradient_background(PROCESS_SIZE[0], PROCESS_SIZE[1])
@@ -528,8 +1042,8 @@ def create_video_single(srt_filename, audio_filename, output_filename, screen_si
         if not os.path.exists(font_path):
             raise RuntimeError("必须的字体文件缺失: ceym.ttf")
         
-        font_title = ImageFont.truetype(font_path, TITLE_FONT_SIZE)
-        font_sub = ImageFont.truetype(font_path, SUB_FONT_SIZE)
+        font_title = get_font(font_path, TITLE_FONT_SIZE)
+        font_sub = get_font(font_path, SUB_FONT_SIZE)
 
         title_layer = draw_text_on_frame(
             frame=bg,
@@ -543,9 +1057,199 @@ def create_video_single(srt_filename, audio_filename, output_filename, screen_si
             use_shadow=False
         )
 
-        # 保持原有cmd参数（包括注释）完全不变
+        # 字幕贴图只渲染一次，字幕区间内复用同一帧
+        compositor = StaticLayerCompositor(
+            base_frame=title_layer,
+            font=font_sub,
+            color=SUB_COLOR,
+            position=SUB_POSITION,
+            screen_size=PROCESS_SIZE,
+            stroke_width=SUB_STROKE_WIDTH,
+            stroke_color=SUB_STROKE_COLOR,
+            use_shadow=SUB_USE_SHADOW
+        )
+
+        duration = cues.duration
+        render_mode = render_mode or PROFILE.get('render_mode', 'frames')
+        if render_mode == "stills":
+            # 每条字幕只输出一张静帧，由 ffconcat 给出时长，按可变帧率编码
+            still_dir = tempfile.mkdtemp(prefix="stills_", dir=work_dir)
+            segments = build_cue_timeline(sub_times, duration, FPS)
+            video_input = ['-f', 'concat', '-safe', '0', '-i', write_cue_stills(segments, compositor, still_dir, FPS)]
+            frame_sync = ['-fps_mode', 'vfr', *timeline_limit(segments, FPS)]
+        else:
+            video_input = [
+                '-f', 'rawvideo',
+                '-vcodec', 'rawvideo',
+                '-s', f'{PROCESS_SIZE[0]}x{PROCESS_SIZE[1]}',
+                '-pix_fmt', 'bgr24',
+                '-r', str(FPS),
+                '-i', '-'
+            ]
+            frame_sync = []
+
+        # 编码器由注册表按本机能力选择（纯CPU机器上为 libx264）
+        encoder = encoder or select_encoder(PROFILE['speed'], PROFILE['quality'])
+        print(f"视频编码器: {encoder['name']}")
+
         cmd = [
             'ffmpeg', '-y',
+            *encoder['input_args'],
+            '-thread_queue_size', '2048',
+            *video_input,
+            '-thread_queue_size', '512',
+            '-i', audio_filename,
+            *encoder['output_args'],
+            '-movflags', '+faststart',
+            '-c:a', 'aac',
+            '-ar', '44100',
+            '-b:a', '128k',
+            '-ac', '1',
+            *frame_sync,
+            '-metadata', f'title={title_txt}',
+            '-metadata', 'encoder=FFmpeg',
+            output_filename
+        ]
+
+        if render_mode == "stills":
+            try:
+                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            finally:
+                shutil.rmtree(still_dir, ignore_errors=True)
+        else:
+            with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) as proc:
+                if workers > 1:
+                    # 多进程渲染：标题层经共享内存下发，各进程并行合成字幕帧
+                    with ParallelFrameRenderer(
+                        title_layer, (font_path, SUB_FONT_SIZE), SUB_COLOR, SUB_POSITION, PROCESS_SIZE,
+                        SUB_STROKE_WIDTH, SUB_STROKE_COLOR, SUB_USE_SHADOW, workers=workers
+                    ) as renderer:
+                        renderer.stream(build_cue_timeline(sub_times, duration, FPS), proc.stdin)
+                else:
+                    stream_segments(build_cue_timeline(sub_times, duration, FPS), compositor, proc.stdin)
+
+                proc.stdin.close()
+                if proc.wait() != 0:
+                    raise RuntimeError(f"视频编码失败，ffmpeg 返回码 {proc.returncode}")
+
+        print(f"视频生成成功 | 耗时: {time.time()-start_time:.1f}秒")
+        return True
+
+    except Exception as e:
+        print(f"生成失败: {str(e)}")
+        return False
+     
+# ===== 流水线渲染：语音合成与视频编码重叠进行 =====
+def create_video_streaming(text, voice, audio_filename, srt_filename, output_filename, screen_size, title_txt, max_cue_s=2, workers=1, encoder=None, profile="standard", layout=None, work_dir=None):
+    """边合成边渲染（单音色文本）
+
+    合成线程把逐词时间轴经 CueMerger 增量合并为字幕条目，合并完成一条就交给渲染循环，
+    ffmpeg 同时在编码已到达部分的画面；音频随合成写入 audio_filename，全部结束后
+    以视频流拷贝的方式与音频封装，总耗时接近 max(合成, 渲染) 而不是两者之和。
+    合并后的字幕同样写入 srt_filename，画面与“speaking + merge_subtitles + create_video_single(frames)”逐帧一致。
+    layout 为字幕排版约束（见 subtitle_layout），与 merge_subtitles 的同名参数含义相同；
+    work_dir 为任务工作区，未封装音频的视频流暂存其中。
+    与其他渲染器不同，语音合成或编码失败时异常直接抛出（合成失败时没有可用的音频和字幕）。
+    """
+    start_time = time.time()
+    video_tmp = None
+    synthesizer = None
+    stop = threading.Event()  # 渲染/编码失败时通知合成线程停止，不再在任务清理后继续写音频
+    try:
+        # 核心参数配置（同 create_video_single）
+        PROFILE = get_render_profile(profile)
+        SCALE = PROFILE['scale']
+        PROCESS_SIZE = (int(screen_size[0] * SCALE), int(screen_size[1] * SCALE))
+        FPS = PROFILE['fps']
+        TITLE_FONT_SIZE = int(85 * SCALE)
+        TITLE_COLOR = (93, 20, 0)
+        TITLE_STROKE_COLOR = (200, 200, 200)
+        TITLE_STROKE_WIDTH = 2
+        TITLE_Y = int(PROCESS_SIZE[1] * 0.5)
+        SUB_FONT_SIZE = int(100 * SCALE)
+        SUB_COLOR = (171, 229, 243)
+        SUB_STROKE_COLOR = (0, 0, 0)
+        SUB_STROKE_WIDTH = 0
+        SUB_POSITION = ("center", "middle")
+        SUB_USE_SHADOW = False
+
+        font_path = current_app.config['VIDEO_FONT_DIR'] / 'ceym.ttf'
+        if not os.path.exists(font_path):
+            raise RuntimeError("必须的字体文件缺失: ceym.ttf")
+
+        bg = create_gradient_background(PROCESS_SIZE[0], PROCESS_SIZE[1])
+        title_layer = draw_text_on_frame(
+            frame=bg,
+            text=title_txt,
+            font=get_font(font_path, TITLE_FONT_SIZE),
+            position=("center", TITLE_Y),
+            screen_size=PROCESS_SIZE,
+            color=TITLE_COLOR,
+            stroke_width=TITLE_STROKE_WIDTH,
+            stroke_color=TITLE_STROKE_COLOR,
+            use_shadow=False
+        )
+        compositor = StaticLayerCompositor(
+            base_frame=title_layer,
+            font=get_font(font_path, SUB_FONT_SIZE),
+            color=SUB_COLOR,
+            position=SUB_POSITION,
+            screen_size=PROCESS_SIZE,
+            stroke_width=SUB_STROKE_WIDTH,
+            stroke_color=SUB_STROKE_COLOR,
+            use_shadow=SUB_USE_SHADOW
+        )
+
+        # 合成线程 -> 渲染循环：合并完成的字幕条目 (开始毫秒, 结束毫秒, 文本)，None 表示结束，异常原样转交
+        cue_queue = queue.Queue()
+
+        async def produce():
+            merger = CueMerger(max_cue_s, **(layout or {}))
+            merged = []
+            os.makedirs(os.path.dirname(audio_filename), exist_ok=True)
+            with open(audio_filename, 'wb') as audio_file:
+                async for part_audio, boundaries in synthesize_stream(text, voice):
+                    if stop.is_set():
+                        return
+                    audio_file.write(part_audio)
+                    audio_file.flush()
+                    for start_ms, end_ms, word in cues_from_boundaries(boundaries):
+                        cue = merger.feed(start_ms, end_ms, word)
+                        if cue:
+                            merged.append(cue)
+                            cue_queue.put(cue)
+            cue = merger.flush()
+            if cue:
+                merged.append(cue)
+                cue_queue.put(cue)
+
+            save_srt(Cues(*zip(*merged)) if merged else Cues(), srt_filename)
+
+        def synthesize_worker():
+            try:
+                asyncio.run(produce())
+                cue_queue.put(None)
+            except BaseException as e:
+                cue_queue.put(e)
+
+        def arrived_cues():
+            while True:
+                item = cue_queue.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield ms2sec(item[0]), ms2sec(item[1]), item[2]
+
+        encoder = encoder or select_encoder(PROFILE['speed'], PROFILE['quality'])
+        print(f"视频编码器: {encoder['name']}")
+
+        # 先只编码视频流（音频此时还在合成），结束后再流拷贝封装音频
+        fd, video_tmp = tempfile.mkstemp(suffix='.mp4', dir=work_dir or os.path.dirname(os.path.abspath(output_filename)))
+        os.close(fd)
+        cmd = [
+            'ffmpeg', '-y',
+            *encoder['input_args'],
             '-thread_queue_size', '2048',
             '-f', 'rawvideo',
             '-vcodec', 'rawvideo',
@@ -553,15 +1257,37 @@ def create_video_single(srt_filename, audio_filename, output_filename, screen_si
             '-pix_fmt', 'bgr24',
             '-r', str(FPS),
             '-i', '-',
-            '-thread_queue_size', '512',
+            *encoder['output_args'],
+            '-an',
+            video_tmp
+        ]
+
+        synthesizer = threading.Thread(target=synthesize_worker, daemon=True)
+        synthesizer.start()
+        with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) as proc:
+            segments = stream_cue_timeline(arrived_cues(), FPS)
+            if workers > 1:
+                with ParallelFrameRenderer(
+                    title_layer, (font_path, SUB_FONT_SIZE), SUB_COLOR, SUB_POSITION, PROCESS_SIZE,
+                    SUB_STROKE_WIDTH, SUB_STROKE_COLOR, SUB_USE_SHADOW, workers=workers
+                ) as renderer:
+                    renderer.stream(segments, proc.stdin)
+            else:
+                stream_segments(segments, compositor, proc.stdin)
+
+            proc.stdin.close()
+            if proc.wait() != 0:
+                raise RuntimeError(f"视频编码失败，ffmpeg 返回码 {proc.returncode}")
+        synthesizer.join()
+        synthesizer = None
+
+        subprocess.run([
+            'ffmpeg', '-y',
+            '-i', video_tmp,
             '-i', audio_filename,
-            '-c:v', 'libx264',
-            '-profile:v', 'main',
-            '-pix_fmt', 'yuv420p',
+            '-map', '0:v', '-map', '1:a',
+            '-c:v', 'copy',
             '-movflags', '+faststart',
-            '-preset', 'fast',
-            '-crf', '23',
-            '-x264-params', 'ref=4:bframes=0',
             '-c:a', 'aac',
             '-ar', '44100',
             '-b:a', '128k',
@@ -569,32 +1295,163 @@ def create_video_single(srt_filename, audio_filename, output_filename, screen_si
             '-metadata', f'title={title_txt}',
             '-metadata', 'encoder=FFmpeg',
             output_filename
-        ]
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
 
-        with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) as proc:
-            for frame_idx in range(int(time2sec(subs[-1].end) * FPS)):
-                frame_time = frame_idx / FPS
-                frame = title_layer.copy()
-                
-                for start, end, text in sub_times:
-                    if start <= frame_time < end:
-                        frame = draw_text_on_frame(
-                            frame=frame,
-                            text=text,
-                            font=font_sub,
-                            position=SUB_POSITION, 
-                            screen_size=PROCESS_SIZE,
-                            color=SUB_COLOR,
-                            stroke_width=SUB_STROKE_WIDTH,
-                            stroke_color=SUB_STROKE_COLOR,
-                            use_shadow=SUB_USE_SHADOW
-                        )
-                        break
-                
-                proc.stdin.write(frame.tobytes())
-            
-            proc.stdin.close()
-            proc.wait()
+        print(f"视频生成成功 | 耗时: {time.time()-start_time:.1f}秒")
+        return True
+
+    except Exception as e:
+        # 语音合成/编码失败直接抛出，由路由返回错误，而不是返回一个不存在的视频
+        print(f"生成失败: {str(e)}")
+        raise
+    finally:
+        if synthesizer is not None:  # 出错退出时合成线程可能还在跑：让它在下一个分块前停下，等它退出再清理
+            stop.set()
+            synthesizer.join()
+        if video_tmp and os.path.exists(video_tmp):
+            os.remove(video_tmp)
+
+# ===== ASS 字幕烧录渲染器：文字由 ffmpeg(libass) 绘制，Python 不参与逐帧渲染 =====
+def ass_color(bgr):
+    """BGR 颜色元组转 ASS 颜色（&HAABBGGRR，AA=00 不透明）"""
+    b, g, r = bgr
+    return f"&H00{b:02X}{g:02X}{r:02X}"
+
+def ass_time(seconds):
+    """秒转 ASS 时间戳 H:MM:SS.cc"""
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+def ass_font_size(font):
+    """PIL 字号是 em 高度，libass 字号对应 ascent+descent 的高度，换算后两者字形大小一致"""
+    ascent, descent = font.getmetrics()
+    return ascent + descent
+
+def ass_font_name(font):
+    """libass 按字体族名匹配，非常规字重的字体族名带字重后缀（如 ceym.ttf 为 TsangerYuMo W05）"""
+    family, style = font.getname()
+    return family if style in ("Regular", "Book", "Normal") else f"{family} {style}"
+
+def srt_to_ass(sub_times, ass_filename, play_res, font, color, stroke_width, stroke_color, use_shadow):
+    """把字幕区间写成 ASS 文件，样式对应 draw_text_on_frame 的参数（居中、描边）"""
+    outline = stroke_width if use_shadow else 0
+    header = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {play_res[0]}",
+        f"PlayResY: {play_res[1]}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Sub,{ass_font_name(font)},{ass_font_size(font)},{ass_color(color)},{ass_color(color)},"
+        f"{ass_color(stroke_color)},&H00000000,0,0,0,0,100,100,0,0,1,{outline},0,5,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    events = []
+    for start, end, text in sub_times:
+        # ASS 中花括号表示样式覆盖，换成全角避免被解析
+        text = text.replace("{", "｛").replace("}", "｝").replace("\n", "\\N")
+        events.append(f"Dialogue: 0,{ass_time(start)},{ass_time(end)},Sub,,0,0,0,,{text}")
+
+    with open(ass_filename, "w", encoding="utf-8") as f:
+        f.write("\n".join(header + events) + "\n")
+
+def ffmpeg_filter_path(path):
+    """滤镜参数中的路径转义（Windows 盘符冒号、反斜杠）"""
+    return str(path).replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+def create_video_ass(srt_filename, audio_filename, output_filename, screen_size, title_txt, encoder=None, profile="standard", cues=None, work_dir=None):
+    """ASS 烧录版本：标题画进静态背景图，字幕转成 ASS 由 ffmpeg 的 ass 滤镜绘制
+    （profile 为 Config.RENDER_PROFILES 中的渲染档位名；encoder 默认按档位自动选择；
+    work_dir 为任务工作区，中间文件放在其中）"""
+    start_time = time.time()
+    ass_dir = tempfile.mkdtemp(prefix="ass_", dir=work_dir)
+    try:
+        # 核心参数配置（与 create_video_single 的画面一致）
+        PROFILE = get_render_profile(profile)
+        SCALE = PROFILE['scale']
+        PROCESS_SIZE = (int(screen_size[0] * SCALE), int(screen_size[1] * SCALE))
+        FPS = PROFILE['fps']
+        TITLE_FONT_SIZE = int(85 * SCALE)
+        TITLE_COLOR = (93, 20, 0)
+        TITLE_STROKE_COLOR = (200, 200, 200)
+        TITLE_STROKE_WIDTH = 2
+        TITLE_Y = int(PROCESS_SIZE[1] * 0.5)
+        SUB_FONT_SIZE = int(100 * SCALE)
+        SUB_COLOR = (171, 229, 243)
+        SUB_STROKE_COLOR = (0, 0, 0)
+        SUB_STROKE_WIDTH = 0
+        SUB_USE_SHADOW = False
+
+        cues = cues if cues is not None else load_srt(srt_filename)
+        sub_times = cues.sub_times()
+        duration = cues.duration
+
+        font_dir = current_app.config['VIDEO_FONT_DIR']
+        font_path = font_dir / 'ceym.ttf'
+        if not os.path.exists(font_path):
+            raise RuntimeError("必须的字体文件缺失: ceym.ttf")
+        font_title = get_font(font_path, TITLE_FONT_SIZE)
+        font_sub = get_font(font_path, SUB_FONT_SIZE)
+
+        # 背景+标题只渲染一次，作为循环输入的静态图
+        bg_path = os.path.join(ass_dir, "background.png")
+        title_layer = draw_text_on_frame(
+            frame=create_gradient_background(PROCESS_SIZE[0], PROCESS_SIZE[1]),
+            text=title_txt,
+            font=font_title,
+            position=("center", TITLE_Y),
+            screen_size=PROCESS_SIZE,
+            color=TITLE_COLOR,
+            stroke_width=TITLE_STROKE_WIDTH,
+            stroke_color=TITLE_STROKE_COLOR,
+            use_shadow=False
+        )
+        cv2.imwrite(bg_path, title_layer)
+
+        ass_path = os.path.join(ass_dir, "subtitles.ass")
+        srt_to_ass(sub_times, ass_path, PROCESS_SIZE, font_sub, SUB_COLOR, SUB_STROKE_WIDTH, SUB_STROKE_COLOR, SUB_USE_SHADOW)
+
+        encoder = encoder or select_encoder(PROFILE['speed'], PROFILE['quality'])
+        print(f"视频编码器: {encoder['name']}")
+
+        # 编码器自带的 -vf（如 VAAPI 的 hwupload）接在 ass 滤镜之后
+        output_args = list(encoder['output_args'])
+        filters = [f"ass=filename='{ffmpeg_filter_path(ass_path)}':fontsdir='{ffmpeg_filter_path(font_dir)}'"]
+        if '-vf' in output_args:
+            i = output_args.index('-vf')
+            filters.append(output_args[i + 1])
+            del output_args[i:i + 2]
+
+        cmd = [
+            'ffmpeg', '-y',
+            *encoder['input_args'],
+            '-loop', '1',
+            '-framerate', str(FPS),
+            '-i', bg_path,
+            '-i', audio_filename,
+            '-vf', ','.join(filters),
+            '-t', f'{duration:.3f}',
+            *output_args,
+            '-movflags', '+faststart',
+            '-c:a', 'aac',
+            '-ar', '44100',
+            '-b:a', '128k',
+            '-ac', '1',
+            '-metadata', f'title={title_txt}',
+            '-metadata', 'encoder=FFmpeg',
+            output_filename
+        ]
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
 
         print(f"视频生成成功 | 耗时: {time.time()-start_time:.1f}秒")
         return True
@@ -602,7 +1459,50 @@ def create_video_single(srt_filename, audio_filename, output_filename, screen_si
     except Exception as e:
         print(f"生成失败: {str(e)}")
         return False
-     
+    finally:
+        shutil.rmtree(ass_dir, ignore_errors=True)
+
+# 封面页面挂在一个虚拟源下：HTML 用 set_content 直接送入页面，字体由路由从内存返回，不落盘也不走 file:// 导航
+COVER_ORIGIN = 'http://cover.local'
+
+@lru_cache(maxsize=4)
+def _compile_cover_template(path, mtime_ns):
+    with open(path, 'r', encoding='utf-8') as file:
+        return Template(file.read())
+
+def cover_template_name():
+    """当前使用的封面模板文件名：应用内优先取 current_app.config，脱离应用上下文时取 Config"""
+    return current_app.config.get('COVER_TEMPLATE', Config.COVER_TEMPLATE) if has_app_context() else Config.COVER_TEMPLATE
+
+def cover_template():
+    """封面模板只编译一次（模板文件修改后自动重新编译）"""
+    path = Config.HTML_DIR / cover_template_name()
+    return _compile_cover_template(str(path), path.stat().st_mtime_ns)
+
+@lru_cache(maxsize=None)
+def _font_bytes(name):
+    path = (Config.VIDEO_FONT_DIR / name).resolve()
+    if path.parent != Path(Config.VIDEO_FONT_DIR).resolve():  # 只允许字体目录下的文件
+        raise FileNotFoundError(name)
+    return path.read_bytes()
+
+def _serve_cover_origin(route):
+    """COVER_ORIGIN 下的请求：/fonts/<文件名> 返回字体，其余返回空白页"""
+    path = route.request.url[len(COVER_ORIGIN):].split('?', 1)[0]
+    if path.startswith('/fonts/'):
+        try:
+            route.fulfill(body=_font_bytes(path[len('/fonts/'):]), content_type='font/ttf')
+        except OSError:
+            route.fulfill(status=404)
+    else:
+        route.fulfill(body='<!DOCTYPE html><html></html>', content_type='text/html')
+
+def _prepare_cover_page(page):
+    """每个 page 只做一次：注册路由并停在虚拟源上，之后 set_content 的字体请求都是同源的"""
+    page.route(f'{COVER_ORIGIN}/**', _serve_cover_origin)
+    page.set_viewport_size({"width": 1200, "height": 1600})
+    page.goto(f'{COVER_ORIGIN}/')
+
 # 创建封面postist和videoist共用，playwright替代selenium
 def creating_cover(text, keywords, cover_filename) -> None:
 
@@ -610,73 +1510,37 @@ def creating_cover(text, keywords, cover_filename) -> None:
     if isinstance(keywords, str):
         keywords = keywords.split(',')
 
-    # 设置路径
-    html_template_path = Config.HTML_DIR / 'template-xhscover.html'
-    html_file_path = Path('./tmp/working.html').resolve()
-    os.makedirs(html_file_path.parent, exist_ok=True)
+    # COVER_RENDERER=pillow 时默认模板（Config.COVER_TEMPLATE）直接用 Pillow 绘制，不需要浏览器；
+    # 失败或应用换用了其他模板时走 Chromium
+    if Config.COVER_RENDERER == 'pillow' and cover_template_name() == Config.COVER_TEMPLATE:
+        try:
+            render_cover(text, keywords, cover_filename)
+            return
+        except Exception as e:
+            print(f"Pillow 封面渲染失败，改用浏览器渲染：{e}")
 
     # 渲染HTML模板
-    with open(html_template_path, 'r', encoding='utf-8') as file:
-        template = Template(file.read())
+    html_content = cover_template().render(text=text, keywords=keywords, font_url=f'{COVER_ORIGIN}/fonts/ceym.ttf')
 
-    html_content = template.render(text=text, keywords=keywords)
-    
-    with open(html_file_path, 'w', encoding='utf-8') as file:
-        file.write(html_content)
+    # 从常驻浏览器池借用页面截图，不再每张封面冷启动一次 Chromium
+    def screenshot(page):
+        page.set_content(html_content)
+        page.wait_for_selector('#text-container')
+        page.evaluate('document.fonts.ready.then(() => true)')  # 等字体加载完、字号调整完再截图
+        page.screenshot(path=cover_filename, full_page=True, type='png')
 
-    # 使用 Playwright 替代 Selenium
-    with sync_playwright() as p:
-        # 启动浏览器（Playwright 会自动下载浏览器，无需单独配置驱动）
-        browser = p.chromium.launch(headless=True)  # 无头模式
-        page = browser.new_page()
-        
-        try:
-            # 打开HTML文件
-            page.set_viewport_size({"width": 1200, "height": 1600})
-            page.goto(f'file://{html_file_path}')
-            
-            # 等待元素加载（Playwright 有更简洁的等待方式）
-            page.wait_for_selector('#text-container')
-            
-            # 获取页面截图
-            page.screenshot(
-                path=cover_filename,
-                full_page=True,
-                type='png'
-            )
-            
-        except Exception as e:
-            print(f"发生错误：{e}")
-        finally:
-            # 关闭浏览器
-            browser.close()
-            if html_file_path.exists():
-                html_file_path.unlink()
+    # 截图失败（含超时）直接抛出，由调用方把任务标记为失败，不带着缺失的封面继续往下走
+    get_browser_pool().run(screenshot, setup=_prepare_cover_page, timeout=Config.COVER_RENDER_TIMEOUT_S)
 
 # gpt part 生成正文，postist_core.py里也有，但后缀不同表示api不同
 def generating_byds(content, prompt_path):
-    client = OpenAI(
-        api_key=os.getenv('API_KEY_DS'),
-        base_url=os.getenv('URL_DS'), 
-    )
     # 定义提示词
-    with open(prompt_path, 'r', encoding='utf-8') as file:
-        your_prompt = file.read()
-    your_prompt = your_prompt + content
+    your_prompt = load_prompt(prompt_path) + content
+    get_client('deepseek')  # 未配置密钥/地址时直接报错，不当作敏感词
     try:
-        completion = client.chat.completions.create(
-            model='deepseek-chat',   
-            messages = [
-                {
-                    "role": "user",
-                    "content": your_prompt
-                }
-            ],
-            stream=False
-        )
-        print(completion.choices[0].message.content)
-        answer = completion.choices[0].message.content
-    except Exception as e:
+        answer = chat('deepseek', [{"role": "user", "content": your_prompt}])
+        print(answer)
+    except APIError as e:
         print("提示", e)
         answer = "敏感词censored by Deepseek"
     print("DeepSeek大模型工作中，请稍等片刻")
@@ -684,28 +1548,13 @@ def generating_byds(content, prompt_path):
 
 # gpt part 生成正文，postist_core.py里也有，但后缀不同表示api不同
 def generating_bykm(content, prompt_path):
-    client = OpenAI(
-        api_key=os.getenv('API_KEY_KIMI'),
-        base_url=os.getenv('URL_KIMI'), 
-    )
     # 定义提示词
-    with open(prompt_path, 'r', encoding='utf-8') as file:
-        your_prompt = file.read()
-    your_prompt = your_prompt + content
+    your_prompt = load_prompt(prompt_path) + content
+    get_client('moonshot')  # 未配置密钥/地址时直接报错，不当作敏感词
     try:
-        completion = client.chat.completions.create(
-            model='moonshot-v1-8k',   
-            messages = [
-                {
-                    "role": "user",
-                    "content": your_prompt
-                }
-            ],
-            stream=False
-        )
-        print(completion.choices[0].message.content)
-        answer = completion.choices[0].message.content
-    except Exception as e:
+        answer = chat('moonshot', [{"role": "user", "content": your_prompt}])
+        print(answer)
+    except APIError as e:
         print("提示", e)
         answer = "敏感词censored by Moonshot"
     print("Moonshot大模型工作中，请稍等片刻")
@@ -713,19 +1562,13 @@ def generating_bykm(content, prompt_path):
 
 # gpt part 生成正文
 def generating_jskb(content, prompt_path):
-    client = OpenAI(
-        api_key=os.getenv('API_KEY_DS'),
-        base_url=os.getenv('URL_DS'), 
-    )
-    # 定义提示词
-    with open(prompt_path, 'r', encoding='utf-8') as file:
-        your_prompt = file.read()
-    # your_prompt = your_prompt + content
+    # 定义提示词（作为 system 消息，正文单独作为 user 消息）
+    your_prompt = load_prompt(prompt_path)
+    get_client('deepseek')  # 未配置密钥/地址时直接报错，不当作敏感词
     try:
-        completion = client.chat.completions.create(
-            model='deepseek-chat',   
-            messages = [{"role": "system", "content": your_prompt}, {"role": "user", "content": content}],
-            stream=False,
+        answer = chat(
+            'deepseek',
+            [{"role": "system", "content": your_prompt}, {"role": "user", "content": content}],
             temperature=0.4,          # 降低随机性
             # max_tokens=4096,          # 防止过长
             top_p=0.9,                # 平衡多样性
@@ -733,8 +1576,7 @@ def generating_jskb(content, prompt_path):
             presence_penalty=0.3,     # 适度控制主题跳跃
             response_format={'type': 'json_object'}
         )
-        answer = completion.choices[0].message.content
-    except Exception as e:
+    except APIError as e:
         print("提示", e)
         answer = "敏感词censored by Deepseek"
     print("DeepSeek大模型工作中，请稍等片刻")
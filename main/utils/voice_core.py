@@ -0,0 +1,65 @@
+# 音色目录：从随项目发布的 edge-tts 音色快照加载一次并缓存在内存中，合成前校验音色，
+# 避免音色名写错时白跑一整轮语音合成 + 渲染。联网时可刷新快照：
+#     python -m main.utils.voice_core [--locales zh-CN,zh-HK,zh-TW]
+import json
+import asyncio
+import argparse
+from datetime import datetime
+from functools import lru_cache
+from config import Config
+
+@lru_cache(maxsize=1)
+def load_catalog():
+    """读取音色快照，返回 {ShortName: 音色信息}（保持快照中的顺序）"""
+    with open(Config.VOICE_CATALOG_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    locales = Config.VOICE_LOCALES
+    return {
+        voice['ShortName']: voice
+        for voice in data['voices']
+        if not locales or voice['Locale'] in locales
+    }
+
+def voice_names():
+    """页面下拉框使用的音色列表"""
+    return list(load_catalog())
+
+def validate_voice(voice):
+    """音色不在目录中时抛出 ValueError"""
+    if voice not in load_catalog():
+        raise ValueError(f'不支持的音色: {voice}')
+    return voice
+
+def validate_voice_mapping(mapping):
+    """校验 角色 -> 音色 映射，返回原映射"""
+    for speaker, voice in mapping.items():
+        if not speaker.strip():
+            raise ValueError('角色名不能为空')
+        if voice not in load_catalog():
+            raise ValueError(f'角色 {speaker} 的音色不受支持: {voice}')
+    return mapping
+
+def refresh_catalog(locales=None):
+    """从 edge-tts 拉取最新音色列表写入快照（需要联网），返回写入的音色数"""
+    import edge_tts
+
+    voices = asyncio.run(edge_tts.list_voices())
+    if locales:
+        voices = [voice for voice in voices if voice['Locale'] in locales]
+    voices = [{key: voice[key] for key in ('ShortName', 'Locale', 'Gender')} for voice in voices]
+    Config.VOICE_CATALOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(Config.VOICE_CATALOG_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'source': 'edge-tts list_voices',
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'voices': voices
+        }, f, ensure_ascii=False, indent=2)
+    load_catalog.cache_clear()
+    return len(voices)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='刷新 edge-tts 音色快照')
+    parser.add_argument('--locales', default=','.join(Config.VOICE_LOCALES), help='只保留这些语言区域，逗号分隔，留空保留全部')
+    args = parser.parse_args()
+    count = refresh_catalog([locale for locale in args.locales.split(',') if locale])
+    print(f"已写入 {count} 个音色: {Config.VOICE_CATALOG_FILE}")
@@ -0,0 +1,37 @@
+# 任务工作区：每个视频任务一个独立的临时目录，语音分段、渲染中间文件都放在里面，
+# 任务结束（包括出错）时由上下文管理器整体清理，多个任务并行时互不覆盖
+import shutil
+import tempfile
+from pathlib import Path
+from config import Config
+
+class JobWorkspace:
+    """用法:
+        with JobWorkspace(job_id) as workspace:
+            process_dialogue(..., temp_dir=workspace.subdir('tts'))
+            create_video_single(..., work_dir=workspace.path)
+    """
+
+    def __init__(self, job_id='job', root=None, keep=None):
+        self.job_id = job_id
+        self.root = Path(root or Config.WORKSPACE_DIR)
+        self.keep = Config.KEEP_WORKSPACE if keep is None else keep  # 调试时保留现场
+        self.path = None
+
+    def __enter__(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        # mkdtemp 保证目录名唯一，同一 job_id 重复提交也不会撞车
+        self.path = Path(tempfile.mkdtemp(prefix=f"{self.job_id}_", dir=self.root))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.keep:
+            print(f"保留任务工作区: {self.path}")
+        else:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def subdir(self, name):
+        """工作区内的子目录（自动创建），返回字符串路径"""
+        path = self.path / name
+        path.mkdir(parents=True, exist_ok=True)
+        return str(path)
@@ -0,0 +1,36 @@
+"""add speaker_voices table
+
+Revision ID: 5c2f8e41d9a7
+Revises: 11b9c7652802
+Create Date: 2025-06-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2f8e41d9a7'
+down_revision = '11b9c7652802'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('speaker_voices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('speaker', sa.String(length=50), nullable=False),
+    sa.Column('voice', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'speaker', name='_user_speaker_uc')
+    )
+    op.create_index('ix_speaker_voices_user_id', 'speaker_voices', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_speaker_voices_user_id', table_name='speaker_voices')
+    op.drop_table('speaker_voices')
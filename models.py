@@ -154,4 +154,24 @@ class WechatAccount(db.Model):
     )
 
     def __repr__(self):
-        return f'<WechatAccount {self.account_name} ({self.account_id})>'
\ No newline at end of file
+        return f'<WechatAccount {self.account_name} ({self.account_id})>'
+
+class SpeakerVoice(db.Model):
+    __tablename__ = 'speaker_voices'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    speaker = db.Column(db.String(50), nullable=False)   # 对话文本中的角色前缀
+    voice = db.Column(db.String(100), nullable=False)    # edge-tts 音色 ShortName
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('speaker_voices', lazy='dynamic'))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'speaker', name='_user_speaker_uc'),
+        db.Index('ix_speaker_voices_user_id', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f'<SpeakerVoice {self.speaker}->{self.voice}>'